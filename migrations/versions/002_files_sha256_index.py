@@ -0,0 +1,22 @@
+"""Index files.sha256 for duplicate detection
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_files_sha256", "files", ["sha256"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_sha256", table_name="files")
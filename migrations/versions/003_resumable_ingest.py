@@ -0,0 +1,33 @@
+"""Resumable ingest: unique chunk ordinals and a per-file checkpoint
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Drop any duplicate ordinals left by earlier non-idempotent ingests
+    op.execute("""
+        DELETE FROM chunks c
+        USING chunks d
+        WHERE c.file_id = d.file_id AND c.ordinal = d.ordinal AND c.ctid > d.ctid
+    """)
+    op.create_unique_constraint("uq_chunks_file_ordinal", "chunks", ["file_id", "ordinal"])
+
+    # Last chunk ordinal committed by the current ingest run; NULL when not ingesting
+    op.add_column("files", sa.Column("ingest_checkpoint", sa.Integer, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("files", "ingest_checkpoint")
+    op.drop_constraint("uq_chunks_file_ordinal", "chunks", type_="unique")
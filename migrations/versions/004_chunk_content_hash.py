@@ -0,0 +1,26 @@
+"""Chunk content hashes for incremental re-ingest
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("chunks", sa.Column("content_hash", sa.String(64), nullable=True))
+    # Must match app.bulk_writer.content_hash: sha256 hex of the stored UTF-8 text
+    op.execute("UPDATE chunks SET content_hash = encode(sha256(convert_to(text, 'UTF8')), 'hex')")
+    op.alter_column("chunks", "content_hash", nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column("chunks", "content_hash")
@@ -0,0 +1,41 @@
+"""Project corpus versions and a semantic answer cache
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bumped whenever a project's searchable content changes
+    op.add_column("projects", sa.Column("corpus_version", sa.BigInteger, nullable=False, server_default="0"))
+
+    # query_embedding is dimension-agnostic; rows are only compared within one project and version
+    op.execute("""
+        CREATE TABLE answer_cache (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+            corpus_version BIGINT NOT NULL,
+            query_text TEXT NOT NULL,
+            query_embedding vector NOT NULL,
+            answer TEXT NOT NULL,
+            citations JSONB,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ DEFAULT now()
+        )
+    """)
+    op.create_index("ix_answer_cache_project_version", "answer_cache", ["project_id", "corpus_version"])
+
+
+def downgrade() -> None:
+    op.drop_table("answer_cache")
+    op.drop_column("projects", "corpus_version")
@@ -0,0 +1,25 @@
+"""Full-text search column on chunks for hybrid retrieval
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated, so every ingest path (COPY, clone, re-ingest) fills it without changes
+    op.execute("ALTER TABLE chunks ADD COLUMN tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', text)) STORED")
+    op.execute("CREATE INDEX ix_chunks_tsv ON chunks USING gin (tsv)")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chunks_tsv", table_name="chunks")
+    op.drop_column("chunks", "tsv")
@@ -0,0 +1,77 @@
+"""Hash-partition vectors by project_id
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+Each partition gets its own HNSW index, so index builds, vacuums and bulk
+deletes touch one partition rather than every tenant's embeddings. The
+partition count is read from VECTOR_PARTITIONS when the migration runs;
+changing it later means re-running this migration's copy.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = int(os.environ.get("VECTOR_PARTITIONS", "16"))
+
+
+def _dimensions() -> int:
+    # vector(n) stores n as the column's typmod; a re-embed may have changed it from 1024
+    return op.get_bind().execute(sa.text(
+        "SELECT atttypmod FROM pg_attribute WHERE attrelid = 'vectors'::regclass AND attname = 'embedding'"
+    )).scalar_one()
+
+
+def _create_indexes() -> None:
+    op.create_index("ix_vectors_project_id", "vectors", ["project_id"])
+    op.execute(
+        "CREATE INDEX ix_vectors_embedding_hnsw ON vectors USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def upgrade() -> None:
+    # Unique keys on a partitioned table must include the partition key
+    op.execute(f"""
+        CREATE TABLE vectors_partitioned (
+            id UUID NOT NULL DEFAULT gen_random_uuid(),
+            chunk_id UUID NOT NULL REFERENCES chunks(id) ON DELETE CASCADE,
+            project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+            embedding vector({_dimensions()}) NOT NULL,
+            CONSTRAINT vectors_pk PRIMARY KEY (id, project_id),
+            CONSTRAINT uq_vectors_chunk_project UNIQUE (chunk_id, project_id)
+        ) PARTITION BY HASH (project_id)
+    """)
+    for i in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE vectors_p{i} PARTITION OF vectors_partitioned FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i})"
+        )
+
+    op.execute("INSERT INTO vectors_partitioned (id, chunk_id, project_id, embedding) SELECT id, chunk_id, project_id, embedding FROM vectors")
+    op.execute("DROP TABLE vectors")
+    op.execute("ALTER TABLE vectors_partitioned RENAME TO vectors")
+
+    # Built after the copy: one bulk build per partition is much faster than incremental inserts
+    _create_indexes()
+
+
+def downgrade() -> None:
+    op.execute(f"""
+        CREATE TABLE vectors_plain (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            chunk_id UUID NOT NULL UNIQUE REFERENCES chunks(id) ON DELETE CASCADE,
+            project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+            embedding vector({_dimensions()}) NOT NULL
+        )
+    """)
+    op.execute("INSERT INTO vectors_plain (id, chunk_id, project_id, embedding) SELECT id, chunk_id, project_id, embedding FROM vectors")
+    op.execute("DROP TABLE vectors")
+    op.execute("ALTER TABLE vectors_plain RENAME TO vectors")
+    _create_indexes()
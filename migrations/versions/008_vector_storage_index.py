@@ -0,0 +1,57 @@
+"""HNSW index matching VECTOR_STORAGE (vector, halfvec or binary)
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+Embeddings stay full precision in vectors.embedding for reranking; only the
+index changes. halfvec halves the index and binary shrinks it about 32x; the
+table's own size is the same in every mode. To
+switch modes, set VECTOR_STORAGE and run `alembic downgrade 007 && alembic
+upgrade head`, then restart the API and worker with the same setting.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STORAGE = os.environ.get("VECTOR_STORAGE", "vector")
+
+# Keep the expressions in sync with FIRST_PASS_DISTANCE in app/services/retrieval.py
+INDEX_EXPRESSIONS = {
+    "halfvec": "(embedding::halfvec({dims})) halfvec_cosine_ops",
+    "binary": "(binary_quantize(embedding)::bit({dims})) bit_hamming_ops",
+}
+
+
+def _dimensions() -> int:
+    # vector(n) stores n as the column's typmod; a re-embed may have changed it
+    return op.get_bind().execute(sa.text(
+        "SELECT atttypmod FROM pg_attribute WHERE attrelid = 'vectors'::regclass AND attname = 'embedding'"
+    )).scalar_one()
+
+
+def upgrade() -> None:
+    if STORAGE == "vector":
+        return
+    if STORAGE not in INDEX_EXPRESSIONS:
+        raise ValueError(f"Unknown VECTOR_STORAGE {STORAGE!r}")
+    expression = INDEX_EXPRESSIONS[STORAGE].format(dims=_dimensions())
+    op.execute("DROP INDEX ix_vectors_embedding_hnsw")
+    op.execute(
+        f"CREATE INDEX ix_vectors_embedding_hnsw ON vectors USING hnsw ({expression}) "
+        "WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_vectors_embedding_hnsw")
+    op.execute(
+        "CREATE INDEX ix_vectors_embedding_hnsw ON vectors USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
@@ -0,0 +1,52 @@
+"""Record the embedding model and dimensions per vector and project-wide
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18
+
+embedding_config holds the model and dimensions that vectors.embedding is
+currently searched with; the re-embed job sets next_* while it fills a side
+column and swaps it in. Existing vectors are recorded as the seeded pair.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MODEL = os.environ.get("BEDROCK_EMBED_MODEL_ID", "amazon.titan-embed-text-v2:0")
+DIMENSIONS = 1024  # vectors.embedding was created as vector(1024)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_config",
+        sa.Column("id", sa.SmallInteger, primary_key=True, server_default="1"),
+        sa.Column("model", sa.String(200), nullable=False),
+        sa.Column("dimensions", sa.Integer, nullable=False),
+        sa.Column("next_model", sa.String(200), nullable=True),
+        sa.Column("next_dimensions", sa.Integer, nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.CheckConstraint("id = 1", name="ck_embedding_config_single_row"),
+    )
+    op.execute(
+        sa.text("INSERT INTO embedding_config (id, model, dimensions) VALUES (1, :model, :dimensions)")
+        .bindparams(model=MODEL, dimensions=DIMENSIONS)
+    )
+
+    # Constant defaults are metadata-only, so existing rows are not rewritten
+    op.add_column("vectors", sa.Column("embed_model", sa.String(200), nullable=False, server_default=MODEL))
+    op.add_column("vectors", sa.Column("embed_dim", sa.SmallInteger, nullable=False, server_default=str(DIMENSIONS)))
+    op.alter_column("vectors", "embed_model", server_default=None)
+    op.alter_column("vectors", "embed_dim", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("vectors", "embed_dim")
+    op.drop_column("vectors", "embed_model")
+    op.drop_table("embedding_config")
@@ -0,0 +1,35 @@
+"""Rolling chat summary and windowed message loading
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18
+
+Messages up to chats.summary_through are folded into chats.summary, so a turn
+loads only the messages after it. clock_timestamp() gives a user message and
+the reply saved in the same transaction distinct, ordered created_at values.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("chats", sa.Column("summary", sa.Text, nullable=True))
+    op.add_column("chats", sa.Column("summary_through", sa.DateTime(timezone=True), nullable=True))
+    op.alter_column("messages", "created_at", server_default=sa.text("clock_timestamp()"))
+    op.drop_index("ix_messages_chat_id", table_name="messages")
+    op.create_index("ix_messages_chat_id_created_at", "messages", ["chat_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_chat_id_created_at", table_name="messages")
+    op.create_index("ix_messages_chat_id", "messages", ["chat_id"])
+    op.alter_column("messages", "created_at", server_default=sa.func.now())
+    op.drop_column("chats", "summary_through")
+    op.drop_column("chats", "summary")
@@ -0,0 +1,27 @@
+"""Token usage per assistant message
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18
+
+Input, output and prompt cache read/write token counts and latency, as
+reported by Bedrock for the call that produced the message.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("messages", sa.Column("usage", JSONB, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("messages", "usage")
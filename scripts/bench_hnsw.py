@@ -0,0 +1,111 @@
+"""Filtered HNSW recall and latency as the number of projects grows.
+
+Builds a synthetic temp table of random vectors spread over N projects, indexes
+it with HNSW, and for each iterative_scan mode measures recall@k against an
+exact (sequential) search with the same project filter, plus p50/p95 latency.
+With iterative_scan=off, small projects in a large table typically come back
+with fewer than k rows. Nothing is written outside the temp table.
+
+Usage:
+    PYTHONPATH=services/worker python scripts/bench_hnsw.py [--rows 50000] [--dim 256] [--projects 1,10,100,1000]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.services.retrieval import to_pgvector
+
+MODES = ["off", "strict_order", "relaxed_order"]
+
+
+def _build(conn, rows: int, dim: int, projects: int):
+    conn.execute(text("DROP TABLE IF EXISTS bench_vectors"))
+    conn.execute(text(f"CREATE TEMP TABLE bench_vectors (id bigint, project_id int, embedding vector({dim}))"))
+    conn.execute(
+        text("""
+            INSERT INTO bench_vectors
+            SELECT i, i % :projects, ARRAY(SELECT random() - 0.5 FROM generate_series(1, :dim) WHERE i > 0)::vector
+            FROM generate_series(1, :rows) i
+        """),
+        {"projects": projects, "dim": dim, "rows": rows},
+    )
+    conn.execute(text("CREATE INDEX ON bench_vectors (project_id)"))
+    conn.execute(
+        text("CREATE INDEX ON bench_vectors USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)")
+    )
+    conn.execute(text("ANALYZE bench_vectors"))
+    conn.commit()
+
+
+def _search(conn, project_id: int, embedding: str, k: int) -> list[int]:
+    return [r[0] for r in conn.execute(
+        text("""
+            SELECT id FROM (
+                SELECT id, embedding <=> CAST(:e AS vector) AS distance
+                FROM bench_vectors WHERE project_id = :p
+                ORDER BY distance LIMIT :k
+            ) r ORDER BY distance
+        """),
+        {"e": embedding, "p": project_id, "k": k},
+    )]
+
+
+def _exact(conn, project_id: int, embedding: str, k: int) -> list[int]:
+    conn.execute(text("SET LOCAL enable_indexscan = off"))
+    conn.execute(text("SET LOCAL enable_bitmapscan = off"))
+    ids = _search(conn, project_id, embedding, k)
+    conn.rollback()
+    return ids
+
+
+def _run_mode(conn, mode: str, queries, truth, k: int, ef_search: int) -> str:
+    latencies, recalls, short = [], [], 0
+    for (project_id, embedding), expected in zip(queries, truth):
+        conn.execute(
+            text("SELECT set_config('hnsw.ef_search', :ef, true), set_config('hnsw.iterative_scan', :mode, true)"),
+            {"ef": str(ef_search), "mode": mode},
+        )
+        start = time.perf_counter()
+        ids = _search(conn, project_id, embedding, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        conn.rollback()
+        short += len(ids) < min(k, len(expected))
+        recalls.append(len(set(ids) & set(expected)) / len(expected) if expected else 1.0)
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return (
+        f"  {mode:<14} recall@{k} {statistics.mean(recalls):.3f}   short results {short:>4}   "
+        f"p50 {statistics.median(latencies):7.2f} ms   p95 {p95:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--projects", default="1,10,100,1000")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=100)
+    args = parser.parse_args()
+
+    # One connection throughout: the temp table lives on it
+    with engine.connect() as conn:
+        for projects in [int(p) for p in args.projects.split(",")]:
+            _build(conn, args.rows, args.dim, projects)
+            queries = [
+                (random.randrange(projects), to_pgvector([random.random() - 0.5 for _ in range(args.dim)]))
+                for _ in range(args.queries)
+            ]
+            truth = [_exact(conn, p, e, args.top_k) for p, e in queries]
+            print(f"{projects} projects, ~{args.rows // projects} vectors each")
+            for mode in MODES:
+                print(_run_mode(conn, mode, queries, truth, args.top_k, args.ef_search))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Retrieval latency benchmark against a live database.
+
+Compares the old two-step lookup (vector search, then a second query for the
+chunks and files) with the single-statement retrieval.search, vector-only and
+hybrid. Queries reuse stored embeddings and chunk text, so Bedrock is not called.
+
+Usage:
+    PYTHONPATH=services/worker python scripts/bench_retrieval.py <project_id> [--queries 200] [--top-k 5]
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import get_session
+from app.services import retrieval
+
+
+def _two_step(session, project_id: str, query: str, embedding: list[float], top_k: int):
+    rows = session.execute(
+        text("""
+            SELECT v.chunk_id, v.embedding <=> CAST(:embedding AS vector) AS distance
+            FROM vectors v
+            WHERE v.project_id = :project_id
+            ORDER BY v.embedding <=> CAST(:embedding AS vector)
+            LIMIT :top_k
+        """),
+        {"embedding": retrieval.to_pgvector(embedding), "project_id": project_id, "top_k": top_k},
+    ).fetchall()
+    chunks = session.execute(
+        text("""
+            SELECT c.id, c.text, c.metadata_json, f.original_name
+            FROM chunks c JOIN files f ON f.id = c.file_id
+            WHERE c.id = ANY(:ids)
+        """),
+        {"ids": [r.chunk_id for r in rows]},
+    ).fetchall()
+    by_id = {str(c.id): c for c in chunks}
+    return [by_id[str(r.chunk_id)] for r in rows if str(r.chunk_id) in by_id]
+
+
+def _sample_queries(session, project_id: str, n: int) -> list[tuple[str, list[float]]]:
+    rows = session.execute(
+        text("""
+            SELECT c.text, v.embedding::text
+            FROM vectors v JOIN chunks c ON c.id = v.chunk_id
+            WHERE v.project_id = :project_id
+            ORDER BY random()
+            LIMIT :n
+        """),
+        {"project_id": project_id, "n": n},
+    ).fetchall()
+    return [(" ".join(chunk_text.split()[:12]), [float(x) for x in emb.strip("[]").split(",")]) for chunk_text, emb in rows]
+
+
+def _time(label: str, fn, session, project_id: str, queries, top_k: int):
+    fn(session, project_id, *queries[0], top_k)  # warm up
+    samples = []
+    for query, embedding in queries:
+        start = time.perf_counter()
+        fn(session, project_id, query, embedding, top_k)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<14} p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms   ({len(samples)} queries)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("project_id")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    session = get_session()
+    try:
+        queries = _sample_queries(session, args.project_id, args.queries)
+        if not queries:
+            raise SystemExit(f"Project {args.project_id} has no vectors")
+
+        def single(hybrid: bool):
+            def run(*a):
+                settings.retrieval_hybrid_enabled = hybrid
+                return retrieval.search(*a)
+            return run
+
+        _time("two-step", _two_step, session, args.project_id, queries, args.top_k)
+        _time("single vector", single(False), session, args.project_id, queries, args.top_k)
+        _time("single hybrid", single(True), session, args.project_id, queries, args.top_k)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
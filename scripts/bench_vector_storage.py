@@ -0,0 +1,104 @@
+"""Compare vector, halfvec and binary-quantized HNSW indexes.
+
+Copies a sample of stored embeddings into a temp table, builds one HNSW index
+per VECTOR_STORAGE mode on it, and reports each index's size, recall@k against
+an exact full-precision search, and p50/p95 latency of retrieval's first pass
+plus rerank. Queries are other stored embeddings, so Bedrock is not called.
+
+The modes only change the index. The table keeps full-precision embeddings for
+the rerank in every mode; its size is reported once, separately.
+
+Usage:
+    PYTHONPATH=services/worker python scripts/bench_vector_storage.py [--rows 50000] [--queries 200] [--top-k 10]
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from app.services import embedding_config
+from app.services.retrieval import nearest_sql
+
+INDEXES = {
+    "vector": "embedding vector_cosine_ops",
+    "halfvec": "(embedding::halfvec({dims})) halfvec_cosine_ops",
+    "binary": "(binary_quantize(embedding)::bit({dims})) bit_hamming_ops",
+}
+
+
+def _build(conn, rows: int, dims: int):
+    conn.execute(text("DROP TABLE IF EXISTS pg_temp.vectors"))
+    # Shadows the real table for this connection only, so nearest_sql runs unchanged
+    conn.execute(text(f"""
+        CREATE TEMP TABLE vectors AS
+        SELECT chunk_id, project_id, embedding::vector({dims}) AS embedding FROM public.vectors ORDER BY random() LIMIT :rows
+    """), {"rows": rows})
+    conn.execute(text("UPDATE vectors SET project_id = '00000000-0000-0000-0000-000000000000'"))
+    for storage, expression in INDEXES.items():
+        conn.execute(text(
+            f"CREATE INDEX bench_{storage} ON vectors USING hnsw ({expression.format(dims=dims)}) WITH (m = 16, ef_construction = 64)"
+        ))
+    conn.execute(text("ANALYZE vectors"))
+    conn.commit()
+
+
+def _nearest(conn, storage: str, dims: int, embedding: str, k: int, exact: bool = False) -> tuple[list, float]:
+    conn.execute(
+        text("SELECT set_config('hnsw.ef_search', :ef, true)"),
+        {"ef": str(max(settings.hnsw_ef_search, settings.vector_rerank_candidates))},
+    )
+    if exact:
+        conn.execute(text("SET LOCAL enable_indexscan = off"))
+    start = time.perf_counter()
+    rows = conn.execute(
+        text(nearest_sql(storage, dims)),
+        {
+            "embedding": embedding, "project_id": "00000000-0000-0000-0000-000000000000",
+            "limit": k, "rerank_candidates": max(k, settings.vector_rerank_candidates),
+        },
+    ).fetchall()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    conn.rollback()
+    return [r.chunk_id for r in rows], elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    # One connection throughout: the temp table lives on it
+    with engine.connect() as conn:
+        dims = embedding_config.active(conn)[1]
+        _build(conn, args.rows, dims)
+        queries = [r[0] for r in conn.execute(
+            text("SELECT embedding::text FROM vectors ORDER BY random() LIMIT :n"), {"n": args.queries}
+        )]
+        truth = [_nearest(conn, "vector", dims, q, args.top_k, exact=True)[0] for q in queries]
+        heap = conn.execute(text("SELECT pg_table_size('vectors')")).scalar()
+        conn.commit()
+        print(f"table (heap + TOAST, every mode) {heap / 1024 / 1024:8.1f} MB")
+
+        for storage in INDEXES:
+            size = conn.execute(text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": f"bench_{storage}"}).scalar()
+            conn.commit()
+            latencies, recalls = [], []
+            for query, expected in zip(queries, truth):
+                ids, elapsed_ms = _nearest(conn, storage, dims, query, args.top_k)
+                latencies.append(elapsed_ms)
+                recalls.append(len(set(ids) & set(expected)) / len(expected))
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(
+                f"{storage:<8} index {size / 1024 / 1024:8.1f} MB   recall@{args.top_k} {statistics.mean(recalls):.3f}   "
+                f"p50 {statistics.median(latencies):7.2f} ms   p95 {p95:7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -26,10 +26,69 @@ class Settings(BaseSettings):
     aws_secret_access_key: str = ""
     bedrock_text_model_id: str = "us.anthropic.claude-opus-4-0-20250514"
     bedrock_embed_model_id: str = "amazon.titan-embed-text-v2:0"
+    # Default only: the model and dimensions vectors are searched with live in embedding_config
+    embed_dimensions: int = 1024
+
+    # Bedrock rate limits (Redis token buckets shared with the worker)
+    bedrock_rate_limit_enabled: bool = True
+    bedrock_embed_rps: float = 20.0
+    bedrock_embed_burst: int = 40
+    bedrock_converse_rps: float = 2.0
+    bedrock_converse_burst: int = 4
+    embed_concurrency: int = 8
+    converse_concurrency: int = 16
+    bedrock_max_retries: int = 3
+
+    # Bedrock transport: executor threads cap concurrent calls, so size them to cover
+    # embed_concurrency + converse_concurrency, with one pooled connection per thread
+    bedrock_executor_workers: int = 32
+    bedrock_max_pool_connections: int = 32
+    bedrock_connect_timeout_s: float = 5.0
+    bedrock_read_timeout_s: float = 120.0
+
+    # Prompt caching: cache checkpoints after the stable prefix of chat and PPT prompts
+    bedrock_prompt_cache_enabled: bool = True
+
+    # Embedding cache (Redis, shared with the worker)
+    embed_cache_enabled: bool = True
+    embed_cache_max_mb: int = 256
+
+    # Query embedding cache (per process, in front of the Redis cache)
+    query_cache_enabled: bool = True
+    query_cache_max_mb: int = 32
+    query_cache_ttl_s: float = 3600.0
+
+    # Retrieval: hybrid full-text + vector search fused with reciprocal rank fusion
+    retrieval_hybrid_enabled: bool = True
+    retrieval_candidates: int = 50
+    retrieval_rrf_k: int = 60
+    hnsw_ef_search: int = 100
+    hnsw_iterative_scan: str = "relaxed_order"  # off | strict_order | relaxed_order (pgvector 0.8+)
+    hnsw_max_scan_tuples: int = 20000
+    vector_storage: str = "vector"  # vector | halfvec | binary; must match the index built by migration 008
+    vector_rerank_candidates: int = 200
+
+    # In-process exact search for projects up to exact_search_max_vectors; larger ones use HNSW
+    exact_search_enabled: bool = True
+    exact_search_max_vectors: int = 20000
+    exact_search_cache_mb: int = 512
+    exact_search_dtype: str = "float32"  # float32 | float16 (half the memory, upcast per block)
+
+    # Chat context: recent turns verbatim, older ones in a rolling summary, chunks within a budget
+    chat_history_turns: int = 6
+    chat_history_tokens: int = 4000
+    chat_summary_batch_turns: int = 4
+    chat_summary_max_tokens: int = 512
+    chat_context_tokens: int = 6000
+
+    # Semantic answer cache (first chat turn only; invalidated by corpus_version)
+    answer_cache_enabled: bool = False
+    answer_cache_threshold: float = 0.97
 
     # Upload limits
     max_upload_size_mb: int = 50
     allowed_extensions: str = ".pdf,.pptx,.xlsx,.docx,.csv,.txt"
+    upload_url_expire_minutes: int = 15
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
@@ -1,16 +1,26 @@
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Annotated
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.responses import HTMLResponse
 
+from app.dependencies import get_current_user
+from app.models.user import User
+from app.services import embedding_cache, query_cache, vector_index
+from app.services.bedrock_client import shutdown_executor
+from app.services.file_service import run_staging_sweeper
 from app.services.storage_client import ensure_buckets
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await ensure_buckets()
+    sweeper = asyncio.create_task(run_staging_sweeper())
     yield
+    sweeper.cancel()
+    shutdown_executor()
 
 
 app = FastAPI(title="Planar", version="0.1.0", lifespan=lifespan)
@@ -21,6 +31,16 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/health/caches")
+async def caches_health(user: Annotated[User, Depends(get_current_user)]):
+    # Signed-in users only: hit rates and sizes say something about what others are asking
+    return {
+        "embedding_cache": await embedding_cache.stats(),
+        "query_cache": query_cache.stats(),
+        "exact_search": vector_index.stats(),
+    }
+
+
 # Routers
 from app.routers import auth, projects, files, chat, ppt  # noqa: E402
 
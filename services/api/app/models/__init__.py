@@ -6,5 +6,7 @@ from app.models.vector import Vector
 from app.models.chat import Chat
 from app.models.message import Message
 from app.models.artifact import Artifact
+from app.models.answer_cache import AnswerCache
+from app.models.embedding_config import EmbeddingConfig
 
-__all__ = ["User", "Project", "File", "Chunk", "Vector", "Chat", "Message", "Artifact"]
+__all__ = ["User", "Project", "File", "Chunk", "Vector", "Chat", "Message", "Artifact", "AnswerCache", "EmbeddingConfig"]
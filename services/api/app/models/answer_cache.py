@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime
+
+from pgvector.sqlalchemy import Vector as PgVector
+from sqlalchemy import BigInteger, Integer, Text, DateTime, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class AnswerCache(Base):
+    __tablename__ = "answer_cache"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    project_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    corpus_version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    query_text: Mapped[str] = mapped_column(Text, nullable=False)
+    query_embedding = mapped_column(PgVector(), nullable=False)  # any dimension
+    answer: Mapped[str] = mapped_column(Text, nullable=False)
+    citations: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    hits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_answer_cache_project_version", "project_id", "corpus_version"),
+    )
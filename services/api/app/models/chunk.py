@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Integer, Text, DateTime, ForeignKey, func
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Computed, Index, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -15,8 +15,15 @@ class Chunk(Base):
     file_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True)
     ordinal: Mapped[int] = mapped_column(Integer, nullable=False)
     text: Mapped[str] = mapped_column(Text, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)  # sha256 of text
     metadata_json: Mapped[dict] = mapped_column(JSONB, nullable=True, default=dict)
+    tsv = mapped_column(TSVECTOR, Computed("to_tsvector('english', text)", persisted=True))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     file = relationship("File", back_populates="chunks")
     vector = relationship("Vector", back_populates="chunk", uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        UniqueConstraint("file_id", "ordinal", name="uq_chunks_file_ordinal"),
+        Index("ix_chunks_tsv", "tsv", postgresql_using="gin"),
+    )
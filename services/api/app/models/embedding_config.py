@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import CheckConstraint, Integer, SmallInteger, String, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class EmbeddingConfig(Base):
+    """Single row: the model and dimensions vectors.embedding is searched with."""
+
+    __tablename__ = "embedding_config"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True, default=1)
+    model: Mapped[str] = mapped_column(String(200), nullable=False)
+    dimensions: Mapped[int] = mapped_column(Integer, nullable=False)
+    next_model: Mapped[str | None] = mapped_column(String(200), nullable=True)  # set while re-embedding
+    next_dimensions: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        CheckConstraint("id = 1", name="ck_embedding_config_single_row"),
+    )
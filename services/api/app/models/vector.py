@@ -1,25 +1,29 @@
 import uuid
 
 from pgvector.sqlalchemy import Vector as PgVector
-from sqlalchemy import ForeignKey, Index
+from sqlalchemy import ForeignKey, Index, SmallInteger, String, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
 
-EMBEDDING_DIM = 1024
-
 
 class Vector(Base):
     __tablename__ = "vectors"
 
+    # Hash-partitioned by project_id (migration 007), so keys include it
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    chunk_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("chunks.id", ondelete="CASCADE"), nullable=False, unique=True)
-    project_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
-    embedding = mapped_column(PgVector(EMBEDDING_DIM), nullable=False)
+    chunk_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("chunks.id", ondelete="CASCADE"), nullable=False)
+    project_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True, index=True)
+    # vector(n) in the database; n follows embedding_config and can change with a re-embed
+    embedding = mapped_column(PgVector(), nullable=False)
+    embed_model: Mapped[str] = mapped_column(String(200), nullable=False)
+    embed_dim: Mapped[int] = mapped_column(SmallInteger, nullable=False)
 
     chunk = relationship("Chunk", back_populates="vector")
 
     __table_args__ = (
+        UniqueConstraint("chunk_id", "project_id", name="uq_vectors_chunk_project"),
         Index("ix_vectors_embedding_hnsw", embedding, postgresql_using="hnsw", postgresql_with={"m": 16, "ef_construction": 64}, postgresql_ops={"embedding": "vector_cosine_ops"}),
+        {"postgresql_partition_by": "HASH (project_id)"},
     )
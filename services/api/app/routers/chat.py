@@ -1,7 +1,10 @@
+import asyncio
+import json
 import uuid
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -12,10 +15,14 @@ from app.models.message import Message
 from app.models.project import Project
 from app.models.user import User
 from app.schemas.chat import ChatResponse, MessageCreate, MessageResponse
-from app.services.chat_service import generate_answer
+from app.services import context_builder
+from app.services.chat_service import generate_answer, stream_answer
 
 router = APIRouter(prefix="/projects/{project_id}", tags=["chat"])
 
+# Streaming answers run as tasks that outlive their request; hold references until they finish
+_answer_tasks: set[asyncio.Task] = set()
+
 
 @router.post("/chats", response_model=ChatResponse, status_code=status.HTTP_201_CREATED)
 async def create_chat(
@@ -64,22 +71,24 @@ async def send_message(
     db.add(user_msg)
     await db.flush()
 
-    # Get chat history
-    result = await db.execute(
-        select(Message).where(Message.chat_id == chat.id).order_by(Message.created_at)
-    )
-    history = result.scalars().all()
+    # Only the turns not yet folded into the chat's summary
+    history = await context_builder.load_history(db, chat)
 
     # Generate answer with RAG
+    usage: dict = {}
     answer_text, citations = await generate_answer(
         project_id=project.id,
+        chat=chat,
         messages=history,
         db=db,
+        usage=usage,
     )
 
     # Save assistant message
     citations_json = [c.model_dump() for c in citations] if citations else None
-    assistant_msg = Message(chat_id=chat.id, role="assistant", content=answer_text, citations=citations_json)
+    assistant_msg = Message(
+        chat_id=chat.id, role="assistant", content=answer_text, citations=citations_json, usage=usage or None
+    )
     db.add(assistant_msg)
     await db.commit()
     await db.refresh(assistant_msg)
@@ -90,6 +99,48 @@ async def send_message(
     )
 
 
+async def _server_sent_events(events: asyncio.Queue) -> AsyncIterator[str]:
+    while (event := await events.get()) is not None:
+        name, data = event
+        yield f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chats/{chat_id}/messages/stream")
+async def stream_message(
+    chat_id: uuid.UUID,
+    body: MessageCreate,
+    project: Annotated[Project, Depends(get_user_project)],
+    user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Like send_message, but streams the answer as Server-Sent Events.
+
+    Events: `citations` (list), then `token` ({"text"}) as the answer is
+    generated, then `done` (the saved message) or `error` ({"detail"}).
+    The answer is generated and saved even if the client disconnects.
+    """
+    result = await db.execute(
+        select(Chat).where(Chat.id == chat_id, Chat.project_id == project.id, Chat.user_id == user.id)
+    )
+    chat = result.scalar_one_or_none()
+    if chat is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found")
+
+    # Committed now: the answer is generated in its own session once this request's is closed
+    db.add(Message(chat_id=chat.id, role="user", content=body.content))
+    await db.commit()
+
+    events: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(stream_answer(project.id, chat.id, events))
+    _answer_tasks.add(task)
+    task.add_done_callback(_answer_tasks.discard)
+    return StreamingResponse(
+        _server_sent_events(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/chats/{chat_id}/messages", response_model=list[MessageResponse])
 async def get_messages(
     chat_id: uuid.UUID,
@@ -1,17 +1,26 @@
-import hashlib
 import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import delete, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.dependencies import get_db, get_user_project
 from app.models.file import File
 from app.models.project import Project
-from app.schemas.file import FileResponse
-from app.services.storage_client import upload_file
+from app.schemas.file import FileResponse, UploadCompleteRequest, UploadInitRequest, UploadInitResponse
+from app.services.answer_cache import bump_corpus_version
+from app.services.file_service import (
+    InvalidUpload,
+    MultipartFileStream,
+    UploadTooLarge,
+    complete_direct_upload,
+    create_direct_upload,
+    enqueue_ingest,
+    enqueue_reingest,
+    store_upload,
+)
 
 router = APIRouter(prefix="/projects/{project_id}/files", tags=["files"])
 
@@ -25,33 +34,87 @@ ALLOWED_MIMES = {
 }
 
 
-@router.post("", response_model=FileResponse, status_code=status.HTTP_201_CREATED)
-async def upload(
-    file: UploadFile,
-    project: Annotated[Project, Depends(get_user_project)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-):
-    # Validate extension
+def _validate_extension(filename: str | None) -> str:
     allowed = [e.strip() for e in settings.allowed_extensions.split(",")]
     ext = ""
-    if file.filename:
-        ext = "." + file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else ""
+    if filename:
+        ext = "." + filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
     if ext not in allowed:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"File type {ext} not allowed")
+    return ext
+
+
+# Boundaries and part headers around the file; a body longer than the size
+# limit plus this is rejected from its Content-Length alone
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+# The upload routes read the body themselves, so FastAPI cannot infer its schema
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                },
+            },
+        },
+    },
+}
 
-    # Read and validate size
-    data = await file.read()
+
+async def _open_upload(request: Request) -> MultipartFileStream:
+    """Start parsing a multipart upload without buffering it.
+
+    An UploadFile parameter would make Starlette spool the whole body to disk
+    before the route runs; this reads it as it arrives instead, so the size
+    limit stops an oversized upload after max_upload_size_mb, not after all of it.
+    """
     max_bytes = settings.max_upload_size_mb * 1024 * 1024
-    if len(data) > max_bytes:
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
         raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+    try:
+        file = MultipartFileStream(request.stream(), request.headers.get("content-type", ""))
+        await file.open()
+    except InvalidUpload as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return file
 
-    # Compute hash
-    sha256 = hashlib.sha256(data).hexdigest()
-    storage_path = f"{project.id}/{sha256}{ext}"
-    mime = ALLOWED_MIMES.get(ext, "application/octet-stream")
 
-    # Upload to MinIO
-    await upload_file(settings.minio_bucket_uploads, storage_path, data, mime)
+async def _store(project_id: uuid.UUID, file: MultipartFileStream, ext: str, mime: str) -> tuple[str, str, int]:
+    try:
+        return await store_upload(project_id, file, ext, mime)
+    except UploadTooLarge:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+    except InvalidUpload as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _file_response(f: File) -> FileResponse:
+    return FileResponse(
+        id=str(f.id), original_name=f.original_name, mime_type=f.mime_type,
+        extension=f.extension, size_bytes=f.size_bytes, status=f.status, created_at=f.created_at,
+    )
+
+
+@router.post(
+    "", response_model=FileResponse, status_code=status.HTTP_201_CREATED, openapi_extra=UPLOAD_REQUEST_BODY
+)
+async def upload(
+    request: Request,
+    project: Annotated[Project, Depends(get_user_project)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    # Validate extension from the part headers, before any file bytes are read
+    file = await _open_upload(request)
+    ext = _validate_extension(file.filename)
+
+    # Stream to MinIO as the body arrives, hashing and enforcing the size limit as we read
+    mime = ALLOWED_MIMES.get(ext, "application/octet-stream")
+    storage_path, sha256, size_bytes = await _store(project.id, file, ext, mime)
 
     # Create DB record
     db_file = File(
@@ -61,7 +124,7 @@ async def upload(
         mime_type=mime,
         extension=ext,
         sha256=sha256,
-        size_bytes=len(data),
+        size_bytes=size_bytes,
         status="pending",
     )
     db.add(db_file)
@@ -69,14 +132,51 @@ async def upload(
     await db.refresh(db_file)
 
     # Enqueue ingestion task
-    from app.services.file_service import enqueue_ingest
     await enqueue_ingest(str(db_file.id))
 
-    return FileResponse(
-        id=str(db_file.id), original_name=db_file.original_name, mime_type=db_file.mime_type,
-        extension=db_file.extension, size_bytes=db_file.size_bytes, status=db_file.status,
-        created_at=db_file.created_at,
+    return _file_response(db_file)
+
+
+@router.post("/uploads", response_model=UploadInitResponse, status_code=status.HTTP_201_CREATED)
+async def init_upload(
+    body: UploadInitRequest,
+    project: Annotated[Project, Depends(get_user_project)],
+):
+    """Step 1 of a direct upload: get a presigned PUT URL for MinIO."""
+    ext = _validate_extension(body.filename)
+    try:
+        token, url, headers, expires_at = await create_direct_upload(
+            project.id, body.filename, ext, body.size_bytes, body.sha256
+        )
+    except UploadTooLarge:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+    return UploadInitResponse(upload_token=token, upload_url=url, upload_headers=headers, expires_at=expires_at)
+
+
+@router.post("/uploads/complete", response_model=FileResponse, status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+    body: UploadCompleteRequest,
+    project: Annotated[Project, Depends(get_user_project)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Step 3 of a direct upload: verify the PUT object, record it, and start ingestion."""
+    try:
+        verified = await complete_direct_upload(project.id, body.upload_token)
+    except InvalidUpload as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    db_file = File(
+        project_id=project.id,
+        mime_type=ALLOWED_MIMES.get(verified["extension"], "application/octet-stream"),
+        status="pending",
+        **verified,
     )
+    db.add(db_file)
+    await db.commit()
+    await db.refresh(db_file)
+
+    await enqueue_ingest(str(db_file.id))
+    return _file_response(db_file)
 
 
 @router.get("", response_model=list[FileResponse])
@@ -88,13 +188,49 @@ async def list_files(
         select(File).where(File.project_id == project.id).order_by(File.created_at.desc())
     )
     files = result.scalars().all()
-    return [
-        FileResponse(
-            id=str(f.id), original_name=f.original_name, mime_type=f.mime_type,
-            extension=f.extension, size_bytes=f.size_bytes, status=f.status, created_at=f.created_at,
-        )
-        for f in files
-    ]
+    return [_file_response(f) for f in files]
+
+
+@router.put("/{file_id}", response_model=FileResponse, openapi_extra=UPLOAD_REQUEST_BODY)
+async def replace_file(
+    file_id: uuid.UUID,
+    request: Request,
+    project: Annotated[Project, Depends(get_user_project)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Upload a new version of a file; only chunks whose text changed are re-embedded."""
+    result = await db.execute(select(File).where(File.id == file_id, File.project_id == project.id))
+    f = result.scalar_one_or_none()
+    if f is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    if f.status in ("pending", "processing"):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="File is still being ingested")
+
+    file = await _open_upload(request)
+    ext = _validate_extension(file.filename)
+    mime = ALLOWED_MIMES.get(ext, "application/octet-stream")
+    storage_path, sha256, size_bytes = await _store(project.id, file, ext, mime)
+
+    f.original_name = file.filename or f.original_name
+    # Same bytes as the current version: nothing to re-ingest
+    if sha256 == f.sha256 and f.status == "ready":
+        await db.commit()
+        await db.refresh(f)
+        return _file_response(f)
+
+    # The previous object is content-addressed and may back other files, so it is kept
+    f.storage_path = storage_path
+    f.mime_type = mime
+    f.extension = ext
+    f.sha256 = sha256
+    f.size_bytes = size_bytes
+    f.status = "pending"
+    f.ingest_checkpoint = None
+    await db.commit()
+    await db.refresh(f)
+
+    await enqueue_reingest(str(f.id))
+    return _file_response(f)
 
 
 @router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -107,5 +243,14 @@ async def delete_file(
     f = result.scalar_one_or_none()
     if f is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
-    await db.delete(f)
+    # Targeted deletes instead of loading every chunk and vector through the ORM cascade
+    await db.execute(
+        text("""
+            DELETE FROM vectors v USING chunks c
+            WHERE v.chunk_id = c.id AND c.file_id = :file_id AND v.project_id = :project_id
+        """),
+        {"file_id": str(f.id), "project_id": str(project.id)},
+    )
+    await db.execute(delete(File).where(File.id == f.id))
+    await bump_corpus_version(db, project.id)
     await db.commit()
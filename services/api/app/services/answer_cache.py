@@ -0,0 +1,73 @@
+import json
+import logging
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.schemas.chat import CitationItem
+
+logger = logging.getLogger(__name__)
+
+BUMP_CORPUS_VERSION_SQL = """
+    WITH p AS (
+        UPDATE projects SET corpus_version = corpus_version + 1 WHERE id = :project_id
+        RETURNING id, corpus_version
+    )
+    DELETE FROM answer_cache a USING p WHERE a.project_id = p.id AND a.corpus_version < p.corpus_version
+"""
+
+
+async def bump_corpus_version(db: AsyncSession, project_id: uuid.UUID):
+    """Invalidate cached answers after the project's searchable content changed."""
+    await db.execute(text(BUMP_CORPUS_VERSION_SQL), {"project_id": str(project_id)})
+
+
+async def corpus_version(db: AsyncSession, project_id: uuid.UUID) -> int:
+    result = await db.execute(text("SELECT corpus_version FROM projects WHERE id = :id"), {"id": str(project_id)})
+    return result.scalar_one()
+
+
+async def lookup(
+    db: AsyncSession, project_id: uuid.UUID, version: int, embedding_str: str
+) -> tuple[str, list[CitationItem]] | None:
+    """Return the cached answer for the nearest stored query, if it is similar enough."""
+    result = await db.execute(
+        text("""
+            SELECT id, answer, citations, 1 - (query_embedding <=> CAST(:embedding AS vector)) AS similarity
+            FROM answer_cache
+            WHERE project_id = :project_id AND corpus_version = :version
+            ORDER BY query_embedding <=> CAST(:embedding AS vector)
+            LIMIT 1
+        """),
+        {"embedding": embedding_str, "project_id": str(project_id), "version": version},
+    )
+    row = result.fetchone()
+    if row is None or row.similarity < settings.answer_cache_threshold:
+        return None
+
+    await db.execute(text("UPDATE answer_cache SET hits = hits + 1 WHERE id = :id"), {"id": row.id})
+    logger.info(f"Answer cache hit for project {project_id} (similarity {row.similarity:.4f})")
+    return row.answer, [CitationItem(**c) for c in row.citations or []]
+
+
+async def store(
+    db: AsyncSession,
+    project_id: uuid.UUID,
+    version: int,
+    query: str,
+    embedding_str: str,
+    answer: str,
+    citations: list[CitationItem],
+):
+    await db.execute(
+        text("""
+            INSERT INTO answer_cache (project_id, corpus_version, query_text, query_embedding, answer, citations)
+            VALUES (:project_id, :version, :query, CAST(:embedding AS vector), :answer, CAST(:citations AS jsonb))
+        """),
+        {
+            "project_id": str(project_id), "version": version, "query": query, "embedding": embedding_str,
+            "answer": answer, "citations": json.dumps([c.model_dump() for c in citations]),
+        },
+    )
@@ -1,11 +1,34 @@
+"""Async Bedrock calls for the API.
+
+The worker's services/worker/app/services/bedrock_client.py is the blocking
+counterpart; retries, rate limiting and prompt caching must behave the same in both.
+"""
 import asyncio
 import json
-from functools import lru_cache
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import AsyncIterator
 
 import boto3
 import numpy as np
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError, ReadTimeoutError
 
 from app.config import settings
+from app.services import embedding_cache, query_cache, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+}
+THROTTLE_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException"}
 
 
 @lru_cache(maxsize=1)
@@ -14,36 +37,196 @@ def _get_bedrock_client():
     if settings.aws_access_key_id:
         kwargs["aws_access_key_id"] = settings.aws_access_key_id
         kwargs["aws_secret_access_key"] = settings.aws_secret_access_key
+    kwargs["config"] = Config(
+        max_pool_connections=settings.bedrock_max_pool_connections,
+        connect_timeout=settings.bedrock_connect_timeout_s,
+        read_timeout=settings.bedrock_read_timeout_s,
+        tcp_keepalive=True,
+        # Retries happen per request in _call_with_retry, under the shared rate limit
+        retries={"total_max_attempts": 1, "mode": "standard"},
+    )
     return boto3.client("bedrock-runtime", **kwargs)
 
 
-async def converse(messages: list[dict], system: str | None = None, max_tokens: int = 4096) -> str:
-    """Call Claude via Bedrock Converse API."""
-    client = _get_bedrock_client()
+@lru_cache(maxsize=1)
+def _get_executor() -> ThreadPoolExecutor:
+    """Threads reserved for blocking Bedrock calls, so chat does not compete with
+    (or get capped by) the event loop's default executor."""
+    return ThreadPoolExecutor(max_workers=settings.bedrock_executor_workers, thread_name_prefix="bedrock")
+
+
+def shutdown_executor():
+    if _get_executor.cache_info().currsize:
+        _get_executor().shutdown(wait=False, cancel_futures=True)
+        _get_executor.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _adaptive_limit(bucket: str) -> rate_limiter.AdaptiveLimit:
+    maximum = settings.embed_concurrency if bucket == "embed" else settings.converse_concurrency
+    return rate_limiter.AdaptiveLimit(maximum)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, ClientError):
+        return exc.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+    return isinstance(exc, (ConnectionError, ReadTimeoutError))
+
+
+def _is_throttle(exc: Exception) -> bool:
+    return isinstance(exc, ClientError) and exc.response.get("Error", {}).get("Code") in THROTTLE_ERROR_CODES
+
+
+async def _call_with_retry(bucket: str, fn, *args, keep_slot: bool = False):
+    """Run a blocking Bedrock call under the shared rate limit and this process's
+    adaptive concurrency limit, retrying transient errors with jittered backoff.
+
+    With keep_slot, a successful call returns still holding its concurrency
+    slot, for a response that is read after the call returns; the caller
+    gives it back with _adaptive_limit(bucket).release().
+    """
+    limit = _adaptive_limit(bucket)
+    for attempt in range(settings.bedrock_max_retries + 1):
+        try:
+            await limit.acquire()
+            try:
+                await rate_limiter.acquire(bucket)
+                result = await asyncio.get_running_loop().run_in_executor(_get_executor(), partial(fn, *args))
+                await limit.on_success()
+            except BaseException:
+                await limit.release()
+                raise
+            if not keep_slot:
+                await limit.release()
+            return result
+        except Exception as e:
+            if _is_throttle(e):
+                limit.on_throttle()
+            if attempt >= settings.bedrock_max_retries or not _is_retryable(e):
+                raise
+            delay = random.uniform(0, min(20.0, 0.5 * 2 ** attempt))
+            logger.warning(f"Bedrock {bucket} attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+# Marks the end of a prompt prefix for Bedrock prompt caching. Claude only caches
+# prefixes of at least 1,024 tokens; shorter ones are sent uncached at no extra cost.
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+MIN_CACHE_TOKENS = 1024
 
+
+def with_cache_point(blocks: list[dict]) -> list[dict]:
+    """Content blocks followed by a cache checkpoint, when prompt caching is enabled."""
+    return [*blocks, CACHE_POINT] if settings.bedrock_prompt_cache_enabled else blocks
+
+
+def _converse_kwargs(messages: list[dict], system: str | list[dict] | None, max_tokens: int) -> dict:
     kwargs = {
         "modelId": settings.bedrock_text_model_id,
         "messages": messages,
         "inferenceConfig": {"maxTokens": max_tokens, "temperature": 0.3},
     }
     if system:
-        kwargs["system"] = [{"text": system}]
+        kwargs["system"] = [{"text": system}] if isinstance(system, str) else system
+    return kwargs
 
-    def _call():
-        response = client.converse(**kwargs)
-        return response["output"]["message"]["content"][0]["text"]
 
-    return await asyncio.to_thread(_call)
+def _record_usage(usage: dict | None, response_usage: dict, metrics: dict):
+    """Log a Converse call's token counts, including prompt cache reads and writes,
+    and copy them into usage when the caller passed a dict to collect them."""
+    counts = {
+        "input_tokens": response_usage.get("inputTokens", 0),
+        "output_tokens": response_usage.get("outputTokens", 0),
+        "cache_read_tokens": response_usage.get("cacheReadInputTokens", 0),
+        "cache_write_tokens": response_usage.get("cacheWriteInputTokens", 0),
+        "latency_ms": metrics.get("latencyMs"),
+    }
+    logger.info(
+        f"Bedrock converse: {counts['input_tokens']} input tokens ({counts['cache_read_tokens']} cache read, "
+        f"{counts['cache_write_tokens']} cache write), {counts['output_tokens']} output, {counts['latency_ms']} ms"
+    )
+    if usage is not None:
+        usage.update(counts)
+
+
+async def converse(
+    messages: list[dict], system: str | list[dict] | None = None, max_tokens: int = 4096, usage: dict | None = None
+) -> str:
+    """Call Claude via Bedrock Converse API.
+
+    system is a string or a list of content blocks (e.g. ending in CACHE_POINT).
+    Token counts are filled into usage, if given.
+    """
+    client = _get_bedrock_client()
+    kwargs = _converse_kwargs(messages, system, max_tokens)
+
+    response = await _call_with_retry("converse", lambda: client.converse(**kwargs))
+    _record_usage(usage, response.get("usage", {}), response.get("metrics", {}))
+    return response["output"]["message"]["content"][0]["text"]
+
 
+async def converse_stream(
+    messages: list[dict], system: str | list[dict] | None = None, max_tokens: int = 4096, usage: dict | None = None
+) -> AsyncIterator[str]:
+    """Call Claude via Bedrock ConverseStream, yielding text as it is generated.
+
+    Opening the stream is rate limited and retried like converse; an error
+    after text has been yielded propagates. The converse concurrency slot is
+    held until the stream is closed, since generation is most of the call.
+    Events are read on the Bedrock executor, one blocking read at a time.
+    Token counts arrive with the last event and are filled into usage, if given.
+    """
+    client = _get_bedrock_client()
+    kwargs = _converse_kwargs(messages, system, max_tokens)
+    response = await _call_with_retry("converse", lambda: client.converse_stream(**kwargs), keep_slot=True)
+    stream = response["stream"]
+    events = iter(stream)
+    loop = asyncio.get_running_loop()
+    try:
+        while (event := await loop.run_in_executor(_get_executor(), next, events, None)) is not None:
+            if "metadata" in event:
+                _record_usage(usage, event["metadata"].get("usage", {}), event["metadata"].get("metrics", {}))
+                continue
+            text = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+            if text:
+                yield text
+    finally:
+        stream.close()
+        await _adaptive_limit("converse").release()
+
+
+async def embed(text: str, model_id: str | None = None, dimensions: int | None = None) -> list[float]:
+    """Embed text via Bedrock Titan Embed V2, consulting the shared cache first.
+
+    model_id and dimensions default to settings; searches pass the active pair
+    from embedding_config.
+    """
+    model_id = model_id or settings.bedrock_embed_model_id
+    dimensions = dimensions or settings.embed_dimensions
+    cached = await embedding_cache.get(text, model_id, dimensions)
+    if cached is not None:
+        return cached
 
-async def embed(text: str) -> list[float]:
-    """Embed text via Bedrock Titan Embed V2."""
     client = _get_bedrock_client()
 
     def _call():
-        body = json.dumps({"inputText": text, "dimensions": 1024, "normalize": True})
-        response = client.invoke_model(modelId=settings.bedrock_embed_model_id, body=body, contentType="application/json")
+        body = json.dumps({"inputText": text, "dimensions": dimensions, "normalize": True})
+        response = client.invoke_model(modelId=model_id, body=body, contentType="application/json")
         result = json.loads(response["body"].read())
         return result["embedding"]
 
-    return await asyncio.to_thread(_call)
+    embedding = await _call_with_retry("embed", _call)
+    await embedding_cache.put(text, embedding, model_id, dimensions)
+    return embedding
+
+
+async def embed_query(text: str, model_id: str | None = None, dimensions: int | None = None) -> list[float]:
+    """Embed a search query, checking this process's query cache before the shared one."""
+    model_id = model_id or settings.bedrock_embed_model_id
+    dimensions = dimensions or settings.embed_dimensions
+    cached = query_cache.get(text, model_id, dimensions)
+    if cached is not None:
+        return cached
+    embedding = await embed(text, model_id, dimensions)
+    query_cache.put(text, embedding, model_id, dimensions)
+    return embedding
@@ -1,24 +1,93 @@
+import asyncio
+import logging
 import uuid
+from dataclasses import dataclass, field
 
-from pgvector.sqlalchemy import Vector as PgVector
-from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.chunk import Chunk
-from app.models.file import File
+from app.config import settings
+from app.database import async_session
+from app.models.chat import Chat
 from app.models.message import Message
-from app.models.vector import Vector
-from app.schemas.chat import CitationItem
-from app.services.bedrock_client import converse, embed
+from app.schemas.chat import CitationItem, MessageResponse
+from app.services import answer_cache, context_builder, embedding_config, retrieval
+from app.services.bedrock_client import MIN_CACHE_TOKENS, converse, converse_stream, embed_query, with_cache_point
 
+logger = logging.getLogger(__name__)
 
-async def generate_answer(
+SYSTEM_PROMPT = """You are a helpful assistant for a project. Answer questions based on the context from project documents given below.
+Always cite your sources by referring to the file names.
+If the context doesn't contain enough information to answer, say so clearly."""
+
+NO_DOCUMENTS_PROMPT = (
+    "You are a helpful assistant for a project. No project documents have been uploaded yet. Let the user know."
+)
+
+
+@dataclass
+class AnswerPlan:
+    """The prompt for one chat turn, or its answer when Claude need not be called."""
+
+    citations: list[CitationItem] = field(default_factory=list)
+    converse_messages: list[dict] = field(default_factory=list)
+    system: list[dict] = field(default_factory=list)
+    answer: str | None = None  # set for a cache hit or an empty question
+    cache_entry: tuple | None = None  # (version, user_query, embedding_str) to store the answer under
+
+
+def _converse_messages(messages: list[Message]) -> list[dict]:
+    """Converse wants roles to alternate; a question left unanswered by a failed turn is merged into the next."""
+    converse_messages: list[dict] = []
+    for m in messages:
+        if converse_messages and converse_messages[-1]["role"] == m.role:
+            converse_messages[-1]["content"].append({"text": m.content})
+        else:
+            converse_messages.append({"role": m.role, "content": [{"text": m.content}]})
+    return converse_messages
+
+
+def _summary_section(chat: Chat) -> str:
+    return f"\n\nSummary of the earlier conversation:\n{chat.summary}" if chat.summary else ""
+
+
+def _prompt(
+    chat: Chat, messages: list[Message], instructions: str, context_text: str | None
+) -> tuple[list[dict], list[dict]]:
+    """(system, messages) laid out for prompt caching.
+
+    Most stable first, each followed by a cache checkpoint: instructions and
+    summary, then the retrieved context, both in the system prompt, then the
+    history. A follow-up that retrieves the same chunks sends the same context
+    text, so its prompt is read from the cache up to the new question; one that
+    retrieves different chunks still reuses the instructions and summary once a
+    long summary takes them past the cacheable minimum. Below it their checkpoint
+    is left out, as it could never be written.
+    """
+    head = instructions + _summary_section(chat)
+    system = [{"text": head}]
+    if context_builder.estimate_tokens(head) >= MIN_CACHE_TOKENS:
+        system = with_cache_point(system)
+    if context_text:
+        system = with_cache_point([*system, {"text": f"Context from project documents:\n{context_text}"}])
+    converse_messages = _converse_messages(messages)
+    if len(converse_messages) > 1:
+        converse_messages[-2]["content"] = with_cache_point(converse_messages[-2]["content"])
+    return system, converse_messages
+
+
+async def plan_answer(
     project_id: uuid.UUID,
+    chat: Chat,
     messages: list[Message],
     db: AsyncSession,
     top_k: int = 5,
-) -> tuple[str, list[CitationItem]]:
-    """RAG: embed query → retrieve chunks → call Claude → return answer + citations."""
+) -> AnswerPlan:
+    """RAG up to the Claude call: embed query → retrieve chunks → build the prompt.
+
+    messages are the chat's messages not yet folded into chat.summary (see
+    context_builder.load_history), ending with the new question. Older turns
+    among them may be folded into the summary here; the caller commits.
+    """
     # Get the latest user message
     user_query = ""
     for msg in reversed(messages):
@@ -27,64 +96,124 @@ async def generate_answer(
             break
 
     if not user_query:
-        return "I need a question to help you.", []
+        return AnswerPlan(answer="I need a question to help you.")
 
     # Embed the query
-    query_embedding = await embed(user_query)
-
-    # Vector search scoped to project
-    embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-    result = await db.execute(
-        text("""
-            SELECT v.id, v.chunk_id, v.embedding <=> CAST(:embedding AS vector) AS distance
-            FROM vectors v
-            WHERE v.project_id = :project_id
-            ORDER BY v.embedding <=> CAST(:embedding AS vector)
-            LIMIT :top_k
-        """),
-        {"embedding": embedding_str, "project_id": str(project_id), "top_k": top_k},
+    query_embedding = await embed_query(user_query, *await embedding_config.active(db))
+    embedding_str = retrieval.to_pgvector(query_embedding)
+
+    # Opening questions repeat across a project's chats; later turns depend on history
+    use_answer_cache = (
+        settings.answer_cache_enabled and chat.summary is None and sum(m.role == "user" for m in messages) == 1
     )
-    rows = result.fetchall()
+    if use_answer_cache:
+        # Read the version before retrieving, so an answer racing an ingest is stored as stale
+        version = await answer_cache.corpus_version(db, project_id)
+        cached = await answer_cache.lookup(db, project_id, version, embedding_str)
+        if cached is not None:
+            return AnswerPlan(answer=cached[0], citations=cached[1])
+
+    # Hybrid (or vector-only) search scoped to project, chunks and files included
+    rows = await retrieval.search(db, project_id, user_query, query_embedding, top_k)
+
+    # Recent turns verbatim; older ones go into the rolling summary once enough have built up
+    older, window = context_builder.split_history(messages)
+    if context_builder.should_fold(older) and await context_builder.fold(chat, older):
+        older = []
+    history = older + window
 
     if not rows:
         # No context available, still answer
-        converse_messages = [{"role": m.role, "content": [{"text": m.content}]} for m in messages]
-        system = "You are a helpful assistant for a project. No project documents have been uploaded yet. Let the user know."
-        answer = await converse(converse_messages, system=system)
-        return answer, []
-
-    # Fetch chunks and file info
-    chunk_ids = [row.chunk_id for row in rows]
-    result = await db.execute(
-        select(Chunk, File.original_name).join(File, Chunk.file_id == File.id).where(Chunk.id.in_(chunk_ids))
+        system, converse_messages = _prompt(chat, history, NO_DOCUMENTS_PROMPT, None)
+        return AnswerPlan(converse_messages=converse_messages, system=system)
+
+    # Cite the best chunks that fit the budget in rank order; lay them out in document
+    # order, so the same chunks give byte-identical context and hit its cache checkpoint
+    fitted = context_builder.fit_chunks(rows)
+    citations = [
+        CitationItem(file_name=row.file_name, chunk_text=row.text[:300], metadata=row.metadata_json)
+        for row, _ in fitted
+    ]
+    context_text = "\n\n---\n\n".join(
+        f"[Source: {row.file_name}]\n{chunk_text}"
+        for row, chunk_text in sorted(fitted, key=lambda item: (item[0].file_name, item[0].ordinal))
     )
-    chunk_data = result.all()
-    chunk_map = {str(chunk.id): (chunk, file_name) for chunk, file_name in chunk_data}
-
-    # Build context
-    context_parts = []
-    citations = []
-    for row in rows:
-        if str(row.chunk_id) in chunk_map:
-            chunk, file_name = chunk_map[str(row.chunk_id)]
-            context_parts.append(f"[Source: {file_name}]\n{chunk.text}")
-            citations.append(CitationItem(
-                file_name=file_name,
-                chunk_text=chunk.text[:300],
-                metadata=chunk.metadata_json,
-            ))
-
-    context_text = "\n\n---\n\n".join(context_parts)
-
-    system = f"""You are a helpful assistant for a project. Answer questions based on the provided context from project documents.
-Always cite your sources by referring to the file names.
-If the context doesn't contain enough information to answer, say so clearly.
+    system, converse_messages = _prompt(chat, history, SYSTEM_PROMPT, context_text)
+
+    return AnswerPlan(
+        citations=citations,
+        converse_messages=converse_messages,
+        system=system,
+        cache_entry=(version, user_query, embedding_str) if use_answer_cache else None,
+    )
+
+
+async def _store_answer(db: AsyncSession, project_id: uuid.UUID, plan: AnswerPlan, answer: str):
+    if plan.cache_entry is not None:
+        version, user_query, embedding_str = plan.cache_entry
+        await answer_cache.store(db, project_id, version, user_query, embedding_str, answer, plan.citations)
+
+
+async def generate_answer(
+    project_id: uuid.UUID,
+    chat: Chat,
+    messages: list[Message],
+    db: AsyncSession,
+    top_k: int = 5,
+    usage: dict | None = None,
+) -> tuple[str, list[CitationItem]]:
+    """RAG: embed query → retrieve chunks → call Claude → return answer + citations.
+
+    Claude's token counts, prompt cache reads and writes included, are filled into usage if given.
+    """
+    plan = await plan_answer(project_id, chat, messages, db, top_k)
+    if plan.answer is not None:
+        return plan.answer, plan.citations
+    answer = await converse(plan.converse_messages, system=plan.system, usage=usage)
+    await _store_answer(db, project_id, plan, answer)
+    return answer, plan.citations
+
+
+async def stream_answer(project_id: uuid.UUID, chat_id: uuid.UUID, events: asyncio.Queue, top_k: int = 5):
+    """Answer the chat's latest question, putting (event, data) pairs on events as it goes.
 
-Context from project documents:
-{context_text}"""
+    Sends the citations first, then the answer text as it streams, then the
+    saved assistant message; None marks the end. Runs as its own task with its
+    own session, so the answer is still saved if the client goes away.
+    """
+    async with async_session() as db:
+        try:
+            chat = await db.get(Chat, chat_id)
+            history = await context_builder.load_history(db, chat)
+            plan = await plan_answer(project_id, chat, history, db, top_k)
+            events.put_nowait(("citations", [c.model_dump() for c in plan.citations]))
 
-    # Build conversation messages for Converse API
-    converse_messages = [{"role": m.role, "content": [{"text": m.content}]} for m in messages]
+            usage: dict = {}
+            if plan.answer is not None:
+                answer = plan.answer
+                events.put_nowait(("token", {"text": answer}))
+            else:
+                parts = []
+                async for text in converse_stream(plan.converse_messages, system=plan.system, usage=usage):
+                    parts.append(text)
+                    events.put_nowait(("token", {"text": text}))
+                answer = "".join(parts)
+                await _store_answer(db, project_id, plan, answer)
 
-    answer = await converse(converse_messages, system=system)
-    return answer, citations
+            citations_json = [c.model_dump() for c in plan.citations] if plan.citations else None
+            message = Message(
+                chat_id=chat.id, role="assistant", content=answer, citations=citations_json, usage=usage or None
+            )
+            db.add(message)
+            await db.commit()
+            await db.refresh(message)
+            events.put_nowait(("done", MessageResponse(
+                id=str(message.id), role=message.role, content=message.content,
+                citations=plan.citations, created_at=message.created_at,
+            ).model_dump(mode="json")))
+        except Exception as e:
+            await db.rollback()
+            logger.exception(f"Error streaming answer for chat {chat_id}: {e}")
+            events.put_nowait(("error", {"detail": "The answer could not be generated"}))
+        finally:
+            events.put_nowait(None)
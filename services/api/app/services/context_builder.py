@@ -0,0 +1,146 @@
+import logging
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.chat import Chat
+from app.models.message import Message
+from app.services.bedrock_client import converse
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a conversation between a user and an assistant about a project's documents.
+Merge the new messages into the existing summary. Keep facts, names, numbers, decisions, the user's goals and open questions; drop pleasantries.
+Reply with the summary only, in at most {words} words."""
+
+
+# Estimate weights in twelfths of a token per character: ASCII runs about four
+# characters a token, CJK about one and a half, other scripts about two
+_ASCII_WEIGHT, _CJK_WEIGHT, _OTHER_WEIGHT = 3, 8, 6
+
+
+def _char_weight(ch: str) -> int:
+    cp = ord(ch)
+    if cp < 128:
+        return _ASCII_WEIGHT
+    if 0x2E80 <= cp <= 0x9FFF or 0xAC00 <= cp <= 0xD7AF or 0xF900 <= cp <= 0xFAFF or 0xFF00 <= cp <= 0xFFEF or cp >= 0x20000:
+        return _CJK_WEIGHT
+    return _OTHER_WEIGHT
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count without a tokenizer, weighted by script. Errs high."""
+    return (sum(_char_weight(ch) for ch in text) + 11) // 12
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """The longest prefix of text whose estimate fits max_tokens."""
+    budget, used = max_tokens * 12, 0
+    for i, ch in enumerate(text):
+        used += _char_weight(ch)
+        if used > budget:
+            return text[:i]
+    return text
+
+
+def _turns(messages: list[Message]) -> list[list[Message]]:
+    """Group messages into turns, each starting at a user message."""
+    turns: list[list[Message]] = []
+    for message in messages:
+        if message.role == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def split_history(
+    messages: list[Message], max_turns: int | None = None, max_tokens: int | None = None
+) -> tuple[list[Message], list[Message]]:
+    """Split messages into (older, window): the window is the newest turns within
+    max_turns and max_tokens, and always holds at least the latest turn."""
+    max_turns = max_turns or settings.chat_history_turns
+    max_tokens = max_tokens or settings.chat_history_tokens
+    turns = _turns(messages)
+    kept, used = 0, 0
+    for turn in reversed(turns):
+        cost = sum(estimate_tokens(m.content) for m in turn)
+        if kept and (kept >= max_turns or used + cost > max_tokens):
+            break
+        kept += 1
+        used += cost
+    older = [m for turn in turns[:len(turns) - kept] for m in turn]
+    window = [m for turn in turns[len(turns) - kept:] for m in turn]
+    return older, window
+
+
+def should_fold(older: list[Message]) -> bool:
+    """Fold in batches, so summarizing costs one extra call every few turns rather than every turn."""
+    if not older:
+        return False
+    turns = sum(m.role == "user" for m in older)
+    return (
+        turns >= settings.chat_summary_batch_turns
+        or sum(estimate_tokens(m.content) for m in older) >= settings.chat_history_tokens // 2
+    )
+
+
+async def fold(chat: Chat, older: list[Message]) -> bool:
+    """Merge older messages into the chat's rolling summary. The caller commits.
+
+    Returns False, leaving the summary as it was, if the summarizing call fails;
+    the messages stay verbatim and folding is tried again next turn.
+    """
+    transcript = "\n\n".join(f"{m.role.capitalize()}: {m.content}" for m in older)
+    prompt = f"Existing summary:\n{chat.summary or '(none)'}\n\nNew messages:\n{transcript}"
+    max_tokens = settings.chat_summary_max_tokens
+    try:
+        summary = await converse(
+            [{"role": "user", "content": [{"text": prompt}]}],
+            system=SUMMARY_SYSTEM_PROMPT.format(words=max_tokens * 3 // 4),
+            max_tokens=max_tokens,
+        )
+    except Exception as e:
+        logger.warning(f"Could not summarize chat {chat.id}, keeping its history verbatim: {e}")
+        return False
+    chat.summary = summary
+    chat.summary_through = older[-1].created_at
+    logger.info(f"Folded {len(older)} messages into the summary of chat {chat.id}")
+    return True
+
+
+async def load_history(db: AsyncSession, chat: Chat) -> list[Message]:
+    """Messages not yet folded into the chat's summary, oldest first.
+
+    Folding keeps this to a few turns past the window; the limit caps it
+    should summarizing fail for a while.
+    """
+    limit = 2 * (settings.chat_history_turns + settings.chat_summary_batch_turns) + 1
+    query = select(Message).where(Message.chat_id == chat.id)
+    if chat.summary_through is not None:
+        query = query.where(Message.created_at > chat.summary_through)
+    result = await db.execute(query.order_by(Message.created_at.desc()).limit(limit))
+    messages = list(reversed(result.scalars().all()))
+    # Converse needs the conversation to open with a user message
+    while messages and messages[0].role != "user":
+        messages.pop(0)
+    return messages
+
+
+def fit_chunks(rows: list[Row], max_tokens: int | None = None) -> list[tuple[Row, str]]:
+    """Retrieved rows with their text, in rank order, within a token budget.
+
+    Rows that would overflow the budget are skipped in favour of smaller,
+    lower-ranked ones. The top row is always included, cut to the budget if needed.
+    """
+    max_tokens = max_tokens or settings.chat_context_tokens
+    fitted, used = [], 0
+    for row in rows:
+        cost = estimate_tokens(row.text)
+        if used + cost <= max_tokens:
+            fitted.append((row, row.text))
+            used += cost
+        elif not fitted:
+            fitted.append((row, truncate_tokens(row.text, max_tokens)))
+            used = max_tokens
+    return fitted
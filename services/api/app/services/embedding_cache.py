@@ -0,0 +1,130 @@
+"""Content-addressed Redis cache of embeddings.
+
+The worker writes to the same keys through its own synchronous copy of this
+module, so key format and encoding must not drift between the two.
+"""
+import hashlib
+import logging
+import time
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "embcache"
+LRU_KEY = f"{KEY_PREFIX}:lru"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+ENTRY_OVERHEAD_BYTES = 160
+# Titan returns float64 JSON numbers; storing them as-is keeps a hit identical to the miss that wrote it
+VALUE_DTYPE = "<f8"
+
+
+@lru_cache(maxsize=1)
+def _get_redis() -> aioredis.Redis:
+    return aioredis.Redis.from_url(settings.redis_url)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, model_id: str, dimensions: int) -> str:
+    digest = hashlib.sha256(f"{model_id}\x00{dimensions}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+    # v2: float64 payloads; float32 entries written under the old keys age out of the LRU
+    return f"{KEY_PREFIX}:v2:{digest}"
+
+
+def _max_entries(dimensions: int) -> int:
+    return settings.embed_cache_max_mb * 1024 * 1024 // (dimensions * np.dtype(VALUE_DTYPE).itemsize + ENTRY_OVERHEAD_BYTES)
+
+
+async def get_many(texts: list[str], model_id: str, dimensions: int) -> list[list[float] | None]:
+    """Look up cached embeddings; misses come back as None. Fails open on Redis errors."""
+    if not settings.embed_cache_enabled or not texts:
+        return [None] * len(texts)
+
+    keys = [cache_key(t, model_id, dimensions) for t in texts]
+    try:
+        client = _get_redis()
+        values = await client.mget(keys)
+        hits = [k for k, v in zip(keys, values) if v is not None]
+        pipe = client.pipeline(transaction=False)
+        if hits:
+            now = time.time()
+            pipe.zadd(LRU_KEY, {k: now for k in hits})
+            pipe.hincrby(STATS_KEY, "hits", len(hits))
+        if len(hits) < len(keys):
+            pipe.hincrby(STATS_KEY, "misses", len(keys) - len(hits))
+            # A payload evicted by Redis itself leaves its LRU member behind
+            pipe.zrem(LRU_KEY, *[k for k, v in zip(keys, values) if v is None])
+        await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache unavailable: {e}")
+        return [None] * len(texts)
+
+    return [np.frombuffer(v, dtype=VALUE_DTYPE).tolist() if v is not None else None for v in values]
+
+
+async def put_many(items: list[tuple[str, list[float]]], model_id: str, dimensions: int):
+    """Store embeddings and evict least recently used entries beyond the size budget."""
+    if not settings.embed_cache_enabled or not items:
+        return
+
+    try:
+        client = _get_redis()
+        now = time.time()
+        pipe = client.pipeline(transaction=False)
+        for text, embedding in items:
+            key = cache_key(text, model_id, dimensions)
+            pipe.set(key, np.asarray(embedding, dtype=VALUE_DTYPE).tobytes())
+            pipe.zadd(LRU_KEY, {key: now})
+        pipe.zcard(LRU_KEY)
+        size = (await pipe.execute())[-1]
+
+        excess = size - _max_entries(dimensions)
+        if excess > 0:
+            oldest = await client.zrange(LRU_KEY, 0, excess - 1)
+            if oldest:
+                # Member and payload go together; members whose payload is already gone are not counted
+                pipe = client.pipeline(transaction=True)
+                pipe.zrem(LRU_KEY, *oldest)
+                pipe.delete(*oldest)
+                evicted = (await pipe.execute())[-1]
+                if evicted:
+                    await client.hincrby(STATS_KEY, "evictions", evicted)
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache unavailable: {e}")
+
+
+async def get(text: str, model_id: str, dimensions: int) -> list[float] | None:
+    return (await get_many([text], model_id, dimensions))[0]
+
+
+async def put(text: str, embedding: list[float], model_id: str, dimensions: int):
+    await put_many([(text, embedding)], model_id, dimensions)
+
+
+async def stats() -> dict:
+    """Hit/miss/eviction counters shared by every API and worker process.
+
+    Reports the error instead of the counters when Redis is unreachable.
+    """
+    try:
+        client = _get_redis()
+        counters = {k.decode(): int(v) for k, v in (await client.hgetall(STATS_KEY)).items()}
+        entries = await client.zcard(LRU_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache unavailable: {e}")
+        return {"error": str(e)}
+    return {
+        "hits": counters.get("hits", 0),
+        "misses": counters.get("misses", 0),
+        "evictions": counters.get("evictions", 0),
+        "entries": entries,
+    }
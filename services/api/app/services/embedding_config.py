@@ -0,0 +1,15 @@
+"""The active embedding model and dimensions; the worker reads them with a synchronous twin of this module."""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+ACTIVE_SQL = "SELECT model, dimensions FROM embedding_config WHERE id = 1"
+
+
+async def active(db: AsyncSession) -> tuple[str, int]:
+    """The (model, dimensions) pair vectors.embedding currently holds and is searched with."""
+    row = (await db.execute(text(ACTIVE_SQL))).fetchone()
+    if row is None:
+        return settings.bedrock_embed_model_id, settings.embed_dimensions
+    return row.model, row.dimensions
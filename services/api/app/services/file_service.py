@@ -1,11 +1,279 @@
 import asyncio
+import base64
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, BinaryIO
 
 from celery import Celery
+from jose import JWTError, jwt
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
 
 from app.config import settings
+from app.services.auth_service import ALGORITHM
+from app.services.storage_client import (
+    copy_object,
+    object_stat,
+    presigned_put_url,
+    remove_object,
+    remove_objects_older_than,
+    upload_stream,
+)
+
+logger = logging.getLogger(__name__)
 
 _celery = Celery(broker=settings.redis_url)
 
+# Uploads are written here until their hash is known; one prefix so abandoned ones can be swept
+STAGING_PREFIX = "staging/"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class InvalidUpload(Exception):
+    pass
+
+
+class HashingReader:
+    """Read-only file wrapper that hashes and counts bytes as they are read.
+
+    Raises UploadTooLarge as soon as more than max_bytes have been read.
+    """
+
+    def __init__(self, raw: BinaryIO, max_bytes: int):
+        self.raw = raw
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+        self._hash.update(data)
+        return data
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+
+class MultipartFileStream:
+    """The file field of a multipart/form-data body, parsed as the body arrives.
+
+    Starlette's UploadFile only exists once the whole body is spooled to a temp
+    file; this reads request.stream() instead. open() consumes the body up to
+    the file's part headers, so its filename can be checked before anything is
+    stored. read() then pulls more of the body only as it is asked for. It
+    blocks on the event loop, so call it from a thread (upload_stream does).
+    """
+
+    def __init__(self, body: AsyncIterator[bytes], content_type: str, field: str = "file"):
+        mime, options = parse_options_header(content_type)
+        if mime != b"multipart/form-data" or b"boundary" not in options:
+            raise InvalidUpload("Expected a multipart/form-data body")
+        self.field = field
+        self.filename: str | None = None
+        self._body = body
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._buffer = bytearray()
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_file = False
+        self._file_done = False
+        self._eof = False
+        self._parser = MultipartParser(options[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name, self._header_value = b"", b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if self.filename is None and options.get(b"name") == self.field.encode() and b"filename" in options:
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+            self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._buffer += data[start:end]
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file, self._file_done = False, True
+
+    async def _pump(self):
+        try:
+            self._parser.write(await anext(self._body))
+        except StopAsyncIteration:
+            self._eof = True
+            if self.filename is not None and not self._file_done:
+                raise InvalidUpload("Upload ended before the file did")
+        except MultipartParseError as e:
+            raise InvalidUpload(f"Malformed multipart body: {e}")
+
+    async def open(self):
+        """Read the body up to the start of the file's bytes."""
+        self._loop = asyncio.get_running_loop()
+        while self.filename is None and not self._eof:
+            await self._pump()
+        if self.filename is None:
+            raise InvalidUpload(f"No {self.field} field in the upload")
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._file_done and (size < 0 or len(self._buffer) < size):
+            asyncio.run_coroutine_threadsafe(self._pump(), self._loop).result()
+        size = len(self._buffer) if size < 0 else min(size, len(self._buffer))
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def checksum_sha256(hex_digest: str) -> str:
+    """A hex SHA-256 in the base64 form S3 checksum headers use."""
+    return base64.b64encode(bytes.fromhex(hex_digest)).decode()
+
+
+def _staging_path(project_id: uuid.UUID, ext: str) -> str:
+    return f"{STAGING_PREFIX}{project_id}/{uuid.uuid4()}{ext}"
+
+
+async def _promote(staging_path: str, project_id: uuid.UUID, sha256: str, ext: str) -> str:
+    """Server-side copy a staged object to its content-addressed key."""
+    storage_path = f"{project_id}/{sha256}{ext}"
+    await copy_object(settings.minio_bucket_uploads, staging_path, storage_path)
+    return storage_path
+
+
+async def store_upload(project_id: uuid.UUID, raw: BinaryIO, ext: str, content_type: str) -> tuple[str, str, int]:
+    """Stream an upload into MinIO and return (storage_path, sha256, size).
+
+    The hash is only known at the end, so bytes go to a staging key as they
+    are read and are then server-side copied to {project}/{sha256}{ext}.
+    """
+    bucket = settings.minio_bucket_uploads
+    reader = HashingReader(raw, settings.max_upload_size_mb * 1024 * 1024)
+    staging_path = _staging_path(project_id, ext)
+    try:
+        await upload_stream(bucket, staging_path, reader, content_type)
+        storage_path = await _promote(staging_path, project_id, reader.sha256, ext)
+    finally:
+        await remove_object(bucket, staging_path)
+    return storage_path, reader.sha256, reader.size
+
+
+async def create_direct_upload(
+    project_id: uuid.UUID, filename: str, ext: str, size_bytes: int, sha256: str,
+) -> tuple[str, str, dict[str, str], datetime]:
+    """Presign a PUT for a staging key and return (upload_token, upload_url, upload_headers, expires_at).
+
+    The token is a signed JWT carrying what the client declared, so completing
+    the upload needs no server-side state. The URL signs the declared size and
+    SHA-256 (the latter into the required upload_headers), so MinIO refuses
+    any other bytes. Raises UploadTooLarge past max_upload_size_mb.
+    """
+    if size_bytes > settings.max_upload_size_mb * 1024 * 1024:
+        raise UploadTooLarge(f"Upload of {size_bytes} bytes exceeds {settings.max_upload_size_mb} MB")
+    staging_path = _staging_path(project_id, ext)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.upload_url_expire_minutes)
+    checksum = checksum_sha256(sha256)
+    url = await presigned_put_url(
+        settings.minio_bucket_uploads, staging_path, checksum, size_bytes, settings.upload_url_expire_minutes
+    )
+    token = jwt.encode(
+        {
+            "typ": "upload", "project": str(project_id), "key": staging_path, "name": filename,
+            "ext": ext, "size": size_bytes, "sha256": sha256, "exp": expires_at,
+        },
+        settings.secret_key,
+        algorithm=ALGORITHM,
+    )
+    return token, url, {"x-amz-checksum-sha256": checksum}, expires_at
+
+
+async def complete_direct_upload(project_id: uuid.UUID, token: str) -> dict:
+    """Verify a directly uploaded object against its token and move it to its final key.
+
+    Returns the verified file fields; raises InvalidUpload on any mismatch.
+    """
+    try:
+        claims = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+    except JWTError:
+        raise InvalidUpload("Invalid or expired upload token")
+    if claims.get("typ") != "upload" or claims.get("project") != str(project_id):
+        raise InvalidUpload("Upload token does not belong to this project")
+
+    bucket = settings.minio_bucket_uploads
+    staging_path = claims["key"]
+    try:
+        stat = await object_stat(bucket, staging_path)
+        if stat is None:
+            raise InvalidUpload("Upload not found")
+        size, checksum = stat
+        if size != claims["size"]:
+            raise InvalidUpload(f"Uploaded {size} bytes, expected {claims['size']}")
+        # MinIO verified this checksum against the bytes on write; no need to read them back
+        if checksum != checksum_sha256(claims["sha256"]):
+            raise InvalidUpload("SHA-256 mismatch")
+        storage_path = await _promote(staging_path, project_id, claims["sha256"], claims["ext"])
+    finally:
+        await remove_object(bucket, staging_path)
+
+    return {
+        "original_name": claims["name"], "storage_path": storage_path, "extension": claims["ext"],
+        "sha256": claims["sha256"], "size_bytes": size,
+    }
+
+
+async def sweep_staging() -> int:
+    """Remove staged objects no upload can still complete.
+
+    A direct upload whose client never calls complete leaves its object behind.
+    Anything older than twice the URL lifetime is past its token's expiry.
+    """
+    age = timedelta(minutes=2 * settings.upload_url_expire_minutes)
+    return await remove_objects_older_than(settings.minio_bucket_uploads, STAGING_PREFIX, age)
+
+
+async def run_staging_sweeper():
+    """Sweep staging every upload_url_expire_minutes until cancelled."""
+    while True:
+        await asyncio.sleep(settings.upload_url_expire_minutes * 60)
+        try:
+            removed = await sweep_staging()
+            if removed:
+                logger.info(f"Removed {removed} abandoned staged uploads")
+        except Exception as e:
+            logger.warning(f"Staging sweep failed: {e}")
+
 
 async def enqueue_ingest(file_id: str):
     await asyncio.to_thread(_celery.send_task, "app.tasks.ingest.ingest_file", args=[file_id])
+
+
+async def enqueue_reingest(file_id: str):
+    await asyncio.to_thread(_celery.send_task, "app.tasks.ingest.reingest_file", args=[file_id])
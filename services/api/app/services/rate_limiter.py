@@ -0,0 +1,122 @@
+"""Redis token bucket and adaptive concurrency limit for Bedrock, shared by every process.
+
+asyncio version of services/worker/app/services/rate_limiter.py, which must use
+the same keys and Lua script so both services draw from one bucket.
+"""
+import asyncio
+import logging
+import random
+import time
+from functools import lru_cache
+
+import redis
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:bedrock"
+
+# Refill the bucket for the time elapsed since the last call, then take one
+# token. Returns 0 when a token was taken, else the milliseconds until one is
+# available. Redis TIME is used so that every host shares one clock.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+
+def _budget(bucket: str) -> tuple[float, int]:
+    if bucket == "embed":
+        return settings.bedrock_embed_rps, settings.bedrock_embed_burst
+    return settings.bedrock_converse_rps, settings.bedrock_converse_burst
+
+
+@lru_cache(maxsize=1)
+def _get_script():
+    return aioredis.Redis.from_url(settings.redis_url).register_script(TOKEN_BUCKET_LUA)
+
+
+async def acquire(bucket: str):
+    """Wait until the shared token bucket for "embed" or "converse" grants a request.
+
+    The bucket lives in Redis, so the budget holds across every API and worker
+    process. Fails open (no limiting) when Redis is unavailable.
+    """
+    if not settings.bedrock_rate_limit_enabled:
+        return
+    rate, burst = _budget(bucket)
+    while True:
+        try:
+            wait_ms = int(await _get_script()(keys=[f"{KEY_PREFIX}:{bucket}"], args=[rate, burst]))
+        except redis.RedisError as e:
+            logger.warning(f"Bedrock rate limiter unavailable: {e}")
+            return
+        if wait_ms <= 0:
+            return
+        # Jitter so waiters across processes do not all retry on the same tick
+        await asyncio.sleep(wait_ms / 1000 * random.uniform(1.0, 1.5))
+
+
+class AdaptiveLimit:
+    """Per-process concurrency limit adjusted AIMD-style.
+
+    Each success raises the limit by 1/limit (about +1 per round of calls);
+    a throttle halves it, at most once per cooldown so one burst of throttles
+    counts as one signal.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, cooldown_s: float = 1.0):
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self.cooldown_s = cooldown_s
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+    async def on_success(self):
+        async with self._cond:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def on_throttle(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown_s:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit / 2)
+        logger.info(f"Bedrock throttled, concurrency limit now {int(self.limit)}")
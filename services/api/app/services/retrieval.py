@@ -0,0 +1,137 @@
+"""Hybrid and vector retrieval for chat.
+
+The worker copy (services/worker/app/services/retrieval.py) runs the same SQL
+synchronously for PPT generation; only this one consults vector_index.
+"""
+import uuid
+
+from sqlalchemy import Row, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.services import vector_index
+
+# First-pass distance for each VECTOR_STORAGE mode. The expressions must match the
+# HNSW expression index (migration 008, or the re-embed job) for the planner to use it.
+FIRST_PASS_DISTANCE = {
+    "halfvec": "v.embedding::halfvec({dims}) <=> CAST(:embedding AS halfvec({dims}))",
+    "binary": "binary_quantize(v.embedding)::bit({dims}) <~> binary_quantize(CAST(:embedding AS vector))",
+}
+
+# Vector and full-text candidates fused with reciprocal rank fusion in one round trip.
+# The tsquery ORs the query's terms: exact identifiers should match even when the
+# rest of a natural-language question does not appear in the chunk.
+HYBRID_SEARCH_SQL = """
+    WITH q AS (
+        SELECT nullif(replace(plainto_tsquery('english', :query)::text, ' & ', ' | '), '')::tsquery AS query
+    ),
+    vec AS (
+        SELECT chunk_id, row_number() OVER (ORDER BY distance) AS rank
+        FROM ({nearest}) nearest
+    ),
+    lex AS (
+        SELECT chunk_id, row_number() OVER (ORDER BY score DESC) AS rank
+        FROM (
+            SELECT c.id AS chunk_id, ts_rank_cd(c.tsv, q.query) AS score
+            FROM chunks c
+            JOIN files f ON f.id = c.file_id
+            CROSS JOIN q
+            WHERE f.project_id = :project_id AND c.tsv @@ q.query
+            ORDER BY score DESC
+            LIMIT :limit
+        ) matches
+    ),
+    fused AS (
+        SELECT chunk_id, sum(1.0 / (:rrf_k + rank)) AS score
+        FROM (SELECT * FROM vec UNION ALL SELECT * FROM lex) ranked
+        GROUP BY chunk_id
+        ORDER BY score DESC
+        LIMIT :top_k
+    )
+    SELECT c.id AS chunk_id, c.text, c.metadata_json, f.original_name AS file_name, c.ordinal,
+           v.embedding <=> CAST(:embedding AS vector) AS distance
+    FROM fused r
+    JOIN chunks c ON c.id = r.chunk_id
+    JOIN files f ON f.id = c.file_id
+    LEFT JOIN vectors v ON v.chunk_id = c.id AND v.project_id = :project_id
+    ORDER BY r.score DESC
+"""
+
+# Nearest vectors joined to their chunk and file in the same statement
+VECTOR_SEARCH_SQL = """
+    SELECT c.id AS chunk_id, c.text, c.metadata_json, f.original_name AS file_name, c.ordinal, r.distance
+    FROM ({nearest}) r
+    JOIN chunks c ON c.id = r.chunk_id
+    JOIN files f ON f.id = c.file_id
+    ORDER BY r.distance
+"""
+
+# Neighbours already ranked in process by vector_index, in the shape nearest_sql returns
+EXACT_NEAREST_SQL = """
+    SELECT * FROM unnest(CAST(:nearest_ids AS uuid[]), CAST(:nearest_distances AS float8[])) AS n(chunk_id, distance)
+"""
+
+
+def nearest_sql(storage: str, dimensions: int) -> str:
+    """Subquery of (chunk_id, distance) for the project's :limit nearest vectors.
+
+    With a compact storage mode the index is searched at reduced precision for
+    :rerank_candidates rows, which are then reranked by full-precision distance.
+    """
+    if storage == "vector":
+        return """
+            SELECT v.chunk_id, v.embedding <=> CAST(:embedding AS vector) AS distance
+            FROM vectors v
+            WHERE v.project_id = :project_id
+            ORDER BY distance
+            LIMIT :limit
+        """
+    return f"""
+        SELECT chunk_id, embedding <=> CAST(:embedding AS vector) AS distance
+        FROM (
+            SELECT v.chunk_id, v.embedding
+            FROM vectors v
+            WHERE v.project_id = :project_id
+            ORDER BY {FIRST_PASS_DISTANCE[storage].format(dims=dimensions)}
+            LIMIT :rerank_candidates
+        ) approx
+        ORDER BY distance
+        LIMIT :limit
+    """
+
+
+def to_pgvector(embedding: list[float]) -> str:
+    return "[" + ",".join(str(x) for x in embedding) + "]"
+
+
+async def search(
+    db: AsyncSession, project_id: uuid.UUID | str, query: str, embedding: list[float], top_k: int
+) -> list[Row]:
+    """Ranked chunks for a query: rows of (chunk_id, text, metadata_json, file_name, ordinal, distance).
+
+    distance is the cosine distance to the query, or None for a full-text hit
+    whose vector is not written yet.
+    """
+    hybrid = settings.retrieval_hybrid_enabled
+    storage = settings.vector_storage
+    limit = max(top_k, settings.retrieval_candidates) if hybrid else top_k
+    index_limit = limit if storage == "vector" else max(limit, settings.vector_rerank_candidates)
+
+    params = {
+        "embedding": to_pgvector(embedding), "project_id": str(project_id), "top_k": top_k,
+        "limit": limit, "rerank_candidates": index_limit,
+    }
+
+    # Small projects are searched exactly in process; large ones fall through to the HNSW index
+    exact = await vector_index.nearest(db, project_id, embedding, limit)
+    if exact is not None:
+        nearest = EXACT_NEAREST_SQL
+        params.update(nearest_ids=exact[0], nearest_distances=exact[1])
+    else:
+        nearest = nearest_sql(storage, len(embedding))
+
+    sql = HYBRID_SEARCH_SQL if hybrid else VECTOR_SEARCH_SQL
+    if hybrid:
+        params.update(query=query, rrf_k=settings.retrieval_rrf_k)
+    result = await db.execute(text(sql.format(nearest=nearest)), params)
+    return result.fetchall()
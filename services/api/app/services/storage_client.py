@@ -1,8 +1,14 @@
 import asyncio
 import io
+from datetime import datetime, timedelta, timezone
 from functools import lru_cache
+from typing import BinaryIO
 
+import boto3
+from botocore.config import Config
 from minio import Minio
+from minio.commonconfig import CopySource
+from minio.error import S3Error
 
 from app.config import settings
 
@@ -17,6 +23,20 @@ def _get_client() -> Minio:
     )
 
 
+@lru_cache(maxsize=1)
+def _get_s3_client():
+    # Only for presigning: the minio client cannot sign headers into a presigned URL
+    scheme = "https" if settings.minio_use_ssl else "http"
+    return boto3.client(
+        "s3",
+        endpoint_url=f"{scheme}://{settings.minio_endpoint}",
+        aws_access_key_id=settings.minio_access_key,
+        aws_secret_access_key=settings.minio_secret_key,
+        region_name="us-east-1",
+        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+    )
+
+
 async def ensure_buckets():
     client = _get_client()
 
@@ -38,6 +58,36 @@ async def upload_file(bucket: str, object_name: str, data: bytes, content_type:
     return await asyncio.to_thread(_upload)
 
 
+async def upload_stream(
+    bucket: str, object_name: str, stream: BinaryIO, content_type: str = "application/octet-stream",
+    part_size: int = 8 * 1024 * 1024,
+) -> str:
+    """Multipart-upload a stream of unknown length, reading one part at a time."""
+    client = _get_client()
+
+    def _upload():
+        client.put_object(bucket, object_name, stream, -1, content_type=content_type, part_size=part_size)
+        return f"{bucket}/{object_name}"
+
+    return await asyncio.to_thread(_upload)
+
+
+async def copy_object(bucket: str, source_name: str, object_name: str) -> str:
+    """Server-side copy within a bucket; no object bytes pass through the API."""
+    client = _get_client()
+
+    def _copy():
+        client.copy_object(bucket, object_name, CopySource(bucket, source_name))
+        return f"{bucket}/{object_name}"
+
+    return await asyncio.to_thread(_copy)
+
+
+async def remove_object(bucket: str, object_name: str):
+    client = _get_client()
+    await asyncio.to_thread(client.remove_object, bucket, object_name)
+
+
 async def download_file(bucket: str, object_name: str) -> bytes:
     client = _get_client()
 
@@ -53,10 +103,67 @@ async def download_file(bucket: str, object_name: str) -> bytes:
 
 
 async def presigned_url(bucket: str, object_name: str, expires_hours: int = 1) -> str:
-    from datetime import timedelta
     client = _get_client()
 
     def _presign():
         return client.presigned_get_object(bucket, object_name, expires=timedelta(hours=expires_hours))
 
     return await asyncio.to_thread(_presign)
+
+
+async def presigned_put_url(
+    bucket: str, object_name: str, checksum_sha256: str, content_length: int, expires_minutes: int = 15
+) -> str:
+    """Presign a PUT of exactly content_length bytes hashing to checksum_sha256 (base64).
+
+    Content-Length and x-amz-checksum-sha256 are signed headers, so MinIO
+    rejects a PUT of any other length or content before storing it.
+    """
+    client = _get_s3_client()
+
+    def _presign():
+        return client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": bucket, "Key": object_name,
+                "ChecksumSHA256": checksum_sha256, "ContentLength": content_length,
+            },
+            ExpiresIn=expires_minutes * 60,
+        )
+
+    return await asyncio.to_thread(_presign)
+
+
+async def object_stat(bucket: str, object_name: str) -> tuple[int, str | None] | None:
+    """(size, base64 SHA-256 checksum) of an object, or None if it does not exist.
+
+    The checksum is the one MinIO verified on write; None if the object was written without one.
+    """
+    client = _get_client()
+
+    def _stat():
+        try:
+            obj = client.stat_object(bucket, object_name, extra_headers={"x-amz-checksum-mode": "ENABLED"})
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return None
+            raise
+        return obj.size, obj.metadata.get("x-amz-checksum-sha256")
+
+    return await asyncio.to_thread(_stat)
+
+
+async def remove_objects_older_than(bucket: str, prefix: str, age: timedelta) -> int:
+    """Delete objects under prefix last modified more than age ago; returns how many."""
+    client = _get_client()
+
+    def _remove():
+        cutoff = datetime.now(timezone.utc) - age
+        removed = 0
+        for obj in client.list_objects(bucket, prefix=prefix, recursive=True):
+            if obj.last_modified is not None and obj.last_modified < cutoff:
+                client.remove_object(bucket, obj.object_name)
+                removed += 1
+        return removed
+
+    return await asyncio.to_thread(_remove)
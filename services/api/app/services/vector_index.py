@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rows are upcast to float32 in blocks of this many when the matrix is float16
+FLOAT16_BLOCK_ROWS = 4096
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class ProjectMatrix:
+    """One project's embeddings as a contiguous, row-normalized matrix.
+
+    Searching is a matrix-vector product and a partial sort: exact, with no
+    index to tune, and fast for the tens of thousands of rows most projects have.
+    """
+
+    def __init__(self, chunk_ids: np.ndarray, matrix: np.ndarray):
+        self.chunk_ids = chunk_ids  # (n, 16) uint8 of raw uuid bytes; S16 would drop trailing NULs
+        self.matrix = matrix
+
+    @property
+    def nbytes(self) -> int:
+        return self.chunk_ids.nbytes + self.matrix.nbytes + ENTRY_OVERHEAD_BYTES
+
+    def _similarities(self, query: np.ndarray) -> np.ndarray:
+        if self.matrix.dtype == np.float32:
+            return self.matrix @ query
+        # numpy has no BLAS path for float16, so upcast a block at a time
+        out = np.empty(len(self.matrix), dtype=np.float32)
+        for start in range(0, len(self.matrix), FLOAT16_BLOCK_ROWS):
+            block = self.matrix[start:start + FLOAT16_BLOCK_ROWS]
+            out[start:start + len(block)] = block.astype(np.float32) @ query
+        return out
+
+    def top_k(self, embedding: list[float], k: int) -> tuple[list[str], list[float]]:
+        """Chunk ids and cosine distances of the k nearest rows, nearest first."""
+        if not len(self.matrix) or k <= 0:
+            return [], []
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        similarities = self._similarities(query)
+        k = min(k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        ids = [str(uuid.UUID(bytes=row.tobytes())) for row in self.chunk_ids[top]]
+        return ids, (1.0 - similarities[top]).astype(float).tolist()
+
+
+class _TooLarge:
+    """Cache marker for a project past the size threshold, so it is not recounted each query."""
+
+    nbytes = ENTRY_OVERHEAD_BYTES
+
+
+TOO_LARGE = _TooLarge()
+
+
+class VectorIndexCache:
+    """LRU of project matrices within a memory budget.
+
+    Keys include the project's corpus_version, which the worker bumps when an
+    ingest finishes, so a finished ingest makes the old matrix unreachable; it
+    ages out of the LRU like any other entry.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, ProjectMatrix | _TooLarge] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> ProjectMatrix | _TooLarge | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, entry: ProjectMatrix | _TooLarge):
+        # A matrix that can never fit is remembered as too large, not reloaded on every query
+        if entry.nbytes > self.max_bytes:
+            entry = TOO_LARGE
+        with self._lock:
+            # Older versions of the same project can never be read again
+            for stale in [k for k in self._entries if k[0] == key[0]]:
+                self._remove(stale)
+            self._entries[key] = entry
+            self.bytes += entry.nbytes
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: tuple):
+        self.bytes -= self._entries.pop(key).nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+            }
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    # Titan returns unit vectors already; normalizing again keeps 1 - dot equal to pgvector's <=>
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _decode(rows, dimensions: int) -> ProjectMatrix:
+    """Build a matrix from (chunk_id, vector_send(embedding)) rows.
+
+    vector_send is two int16 headers (dimensions, unused) followed by big-endian float4s.
+    """
+    chunk_ids = np.empty((len(rows), 16), dtype=np.uint8)
+    matrix = np.empty((len(rows), dimensions), dtype=np.float32)
+    for i, (chunk_id, data) in enumerate(rows):
+        chunk_ids[i] = np.frombuffer(chunk_id.bytes, dtype=np.uint8)
+        matrix[i] = np.frombuffer(data, dtype=">f4", offset=4)
+    return ProjectMatrix(chunk_ids, _normalize(matrix).astype(settings.exact_search_dtype, copy=False))
+
+
+async def _load(db: AsyncSession, project_id: str, dimensions: int) -> ProjectMatrix | _TooLarge:
+    count = (await db.execute(
+        text("SELECT count(*) FROM vectors WHERE project_id = :project_id"), {"project_id": project_id}
+    )).scalar_one()
+    row_bytes = dimensions * np.dtype(settings.exact_search_dtype).itemsize + 16
+    if count > settings.exact_search_max_vectors or count * row_bytes > _get_cache().max_bytes:
+        return TOO_LARGE
+    rows = (await db.execute(
+        text("SELECT chunk_id, vector_send(embedding) FROM vectors WHERE project_id = :project_id"),
+        {"project_id": project_id},
+    )).fetchall()
+    return await asyncio.to_thread(_decode, rows, dimensions)
+
+
+# Loads in progress in this process, so concurrent queries for a key share one load
+_loading: dict[tuple, asyncio.Future] = {}
+
+
+async def _load_once(db: AsyncSession, key: tuple) -> ProjectMatrix | _TooLarge | None:
+    """Load and cache the matrix for key, or wait for the load already running.
+
+    None when the load failed; the query then falls back to pgvector and the
+    next one tries loading again.
+    """
+    pending = _loading.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+    future = asyncio.get_running_loop().create_future()
+    _loading[key] = future
+    entry = None
+    try:
+        project_id, _, dimensions = key
+        entry = await _load(db, project_id, dimensions)
+        _get_cache().put(key, entry)
+        if isinstance(entry, ProjectMatrix):
+            logger.info(f"Loaded {len(entry.matrix)} vectors for project {project_id} ({entry.nbytes} bytes)")
+        return entry
+    finally:
+        del _loading[key]
+        future.set_result(entry)
+
+
+@lru_cache(maxsize=1)
+def _get_cache() -> VectorIndexCache:
+    return VectorIndexCache(settings.exact_search_cache_mb * 1024 * 1024)
+
+
+async def nearest(
+    db: AsyncSession, project_id: uuid.UUID | str, embedding: list[float], k: int
+) -> tuple[list[str], list[float]] | None:
+    """Exact k nearest chunks of a project, or None when it should be searched with pgvector.
+
+    Loads the project's matrix on first use after each corpus_version change.
+    """
+    if not settings.exact_search_enabled:
+        return None
+    project_id = str(project_id)
+    version = (await db.execute(
+        text("SELECT corpus_version FROM projects WHERE id = :id"), {"id": project_id}
+    )).scalar_one()
+    key = (project_id, version, len(embedding))
+
+    entry = _get_cache().get(key)
+    if entry is None:
+        entry = await _load_once(db, key)
+    if entry is None or entry is TOO_LARGE:
+        return None
+    # The product releases the GIL; keep it off the event loop
+    return await asyncio.to_thread(entry.top_k, embedding, k)
+
+
+def stats() -> dict:
+    """Counters for this process only."""
+    return _get_cache().stats()
@@ -0,0 +1,162 @@
+import hashlib
+import io
+import json
+import struct
+import uuid
+
+from pgvector.utils import Vector
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services import embedding_config
+
+# PostgreSQL binary COPY framing: signature, flags, header extension length
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+NULL_FIELD = struct.pack(">i", -1)
+
+
+def encode_uuid(value) -> bytes:
+    return uuid.UUID(str(value)).bytes
+
+
+def encode_int4(value: int) -> bytes:
+    return struct.pack(">i", value)
+
+
+def encode_text(value: str) -> bytes:
+    # Postgres text cannot hold NUL bytes; some PDFs produce them
+    return value.replace("\x00", "").encode("utf-8")
+
+
+def content_hash(value: str) -> str:
+    """sha256 of a chunk's stored text; migration 004 computes the same in SQL."""
+    return hashlib.sha256(encode_text(value)).hexdigest()
+
+
+def encode_jsonb(value) -> bytes:
+    # jsonb binary format is a version byte followed by the JSON text
+    return b"\x01" + encode_text(json.dumps(value))
+
+
+def encode_vector(value) -> bytes:
+    return Vector(value).to_binary()
+
+
+def encode_copy(rows: list[tuple]) -> bytes:
+    """Frame pre-encoded rows (tuples of bytes or None) as a binary COPY stream."""
+    buf = bytearray(COPY_HEADER)
+    for row in rows:
+        buf += struct.pack(">h", len(row))
+        for field in row:
+            if field is None:
+                buf += NULL_FIELD
+            else:
+                buf += struct.pack(">i", len(field))
+                buf += field
+    buf += COPY_TRAILER
+    return bytes(buf)
+
+
+def copy_rows(session: Session, table: str, columns: list[str], rows: list[tuple]):
+    """Load rows into a table with one binary COPY on the session's connection."""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT BINARY)"
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(sql, io.BytesIO(encode_copy(rows)))
+    finally:
+        cursor.close()
+
+
+STAGE_TABLE = "ingest_stage"
+STAGE_COLUMNS = [
+    "chunk_id", "file_id", "ordinal", "text", "content_hash", "metadata_json",
+    "vector_id", "project_id", "embedding", "embed_model", "embed_dim",
+]
+
+
+class BulkWriter:
+    """Buffers chunk and vector rows for one file and writes them in checkpointed batches.
+
+    Each flush COPYs the batch into a temp staging table, upserts chunks on
+    (file_id, ordinal) and vectors on (chunk_id, project_id), advances files.ingest_checkpoint
+    to the batch's last ordinal, and commits. Replaying a batch after a crash
+    is therefore harmless, and a retry can resume after the checkpoint.
+    With checkpoint=False the checkpoint is left alone, for writers whose
+    ordinals are not a resumable prefix of the file (re-ingest).
+
+    Vectors are recorded with the model and dimensions that produced them.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        file_id: str,
+        project_id: str,
+        embed_model: str | None = None,
+        embed_dim: int | None = None,
+        batch_size: int | None = None,
+        checkpoint: bool = True,
+    ):
+        self.session = session
+        self.file_id = file_id
+        self.batch_size = batch_size or settings.ingest_batch_size
+        self.checkpoint = checkpoint
+        self.written = 0
+        self._file_id = encode_uuid(file_id)
+        self._project_id = encode_uuid(project_id)
+        self.embed_model = embed_model or settings.bedrock_embed_model_id
+        self.embed_dim = embed_dim or settings.embed_dimensions
+        self._embed_model = encode_text(self.embed_model)
+        self._embed_dim = encode_int4(self.embed_dim)
+        self._rows: list[tuple] = []
+        self._last_ordinal = -1
+
+    def add(self, ordinal: int, chunk_text: str, metadata: dict, embedding: list[float]):
+        encoded = encode_text(chunk_text)
+        self._rows.append((
+            uuid.uuid4().bytes, self._file_id, encode_int4(ordinal), encoded,
+            hashlib.sha256(encoded).hexdigest().encode("ascii"), encode_jsonb(metadata),
+            uuid.uuid4().bytes, self._project_id, encode_vector(embedding), self._embed_model, self._embed_dim,
+        ))
+        self._last_ordinal = ordinal
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        self.session.execute(text(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} (
+                chunk_id uuid, file_id uuid, ordinal integer, text text, content_hash varchar(64),
+                metadata_json jsonb, vector_id uuid, project_id uuid, embedding vector,
+                embed_model text, embed_dim integer
+            ) ON COMMIT DELETE ROWS
+        """))
+        copy_rows(self.session, STAGE_TABLE, STAGE_COLUMNS, self._rows)
+        self.session.execute(text(f"""
+            INSERT INTO chunks (id, file_id, ordinal, text, content_hash, metadata_json)
+            SELECT chunk_id, file_id, ordinal, text, content_hash, metadata_json FROM {STAGE_TABLE}
+            ON CONFLICT (file_id, ordinal) DO UPDATE
+            SET text = EXCLUDED.text, content_hash = EXCLUDED.content_hash, metadata_json = EXCLUDED.metadata_json
+        """))
+        self.session.execute(text(f"""
+            INSERT INTO vectors (id, chunk_id, project_id, embedding, embed_model, embed_dim)
+            SELECT s.vector_id, c.id, s.project_id, s.embedding, s.embed_model, s.embed_dim
+            FROM {STAGE_TABLE} s
+            JOIN chunks c ON c.file_id = s.file_id AND c.ordinal = s.ordinal
+            ON CONFLICT (chunk_id, project_id) DO UPDATE
+            SET embedding = EXCLUDED.embedding, embed_model = EXCLUDED.embed_model, embed_dim = EXCLUDED.embed_dim
+        """))
+        # The insert's lock orders this batch against a re-embed flip, so this read is current
+        if embedding_config.active(self.session) != (self.embed_model, self.embed_dim):
+            raise RuntimeError("Embedding model changed during ingest; retry to embed with the new one")
+        if self.checkpoint:
+            self.session.execute(
+                text("UPDATE files SET ingest_checkpoint = :ordinal WHERE id = :id"),
+                {"ordinal": self._last_ordinal, "id": self.file_id},
+            )
+        self.session.commit()
+        self.written += len(self._rows)
+        self._rows.clear()
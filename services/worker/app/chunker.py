@@ -1,4 +1,5 @@
 import re
+from typing import Iterable, Iterator
 
 
 def chunk_text(text: str, max_chars: int = 2000, overlap_chars: int = 200) -> list[str]:
@@ -47,3 +48,33 @@ def chunk_text(text: str, max_chars: int = 2000, overlap_chars: int = 200) -> li
         chunks.append(current_chunk.strip())
 
     return chunks
+
+
+def chunk_rows(
+    rows: Iterable[tuple[int, str]], max_rows: int = 50, max_chars: int = 2000,
+) -> Iterator[tuple[str, int, int]]:
+    """Group (row_number, line) table rows into windows, repeating the header row in each.
+
+    The first row is the header. A window closes at max_rows data rows or when
+    the next row would push it past max_chars. Yields (text, first_row, last_row).
+    """
+    it = iter(rows)
+    header = next(it, None)
+    if header is None:
+        return
+    header_no, header_text = header
+
+    window: list[tuple[int, str]] = []
+    size = len(header_text)
+    for row_no, line in it:
+        if window and (len(window) >= max_rows or size + len(line) + 1 > max_chars):
+            yield "\n".join([header_text] + [l for _, l in window]), window[0][0], window[-1][0]
+            window, size = [], len(header_text)
+        window.append((row_no, line))
+        size += len(line) + 1
+
+    if window:
+        yield "\n".join([header_text] + [l for _, l in window]), window[0][0], window[-1][0]
+    elif header_text.strip():
+        # Header-only table
+        yield header_text, header_no, header_no
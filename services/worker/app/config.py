@@ -22,6 +22,68 @@ class Settings(BaseSettings):
     aws_secret_access_key: str = ""
     bedrock_text_model_id: str = "us.anthropic.claude-opus-4-0-20250514"
     bedrock_embed_model_id: str = "amazon.titan-embed-text-v2:0"
+    # Default only: the model and dimensions vectors are searched with live in embedding_config
+    embed_dimensions: int = 1024
+
+    # Embedding stage
+    embed_concurrency: int = 8
+    embed_max_retries: int = 3
+
+    # Bedrock rate limits (Redis token buckets shared with the API)
+    bedrock_rate_limit_enabled: bool = True
+    bedrock_embed_rps: float = 20.0
+    bedrock_embed_burst: int = 40
+    bedrock_converse_rps: float = 2.0
+    bedrock_converse_burst: int = 4
+    converse_concurrency: int = 4
+    converse_max_retries: int = 3
+
+    # Bedrock transport; keep the pool at least as large as embed_concurrency
+    bedrock_max_pool_connections: int = 16
+    bedrock_connect_timeout_s: float = 5.0
+    bedrock_read_timeout_s: float = 120.0
+
+    # Prompt caching: cache checkpoints after the stable prefix of chat and PPT prompts
+    bedrock_prompt_cache_enabled: bool = True
+
+    # Embedding cache (Redis, shared with the API)
+    embed_cache_enabled: bool = True
+    embed_cache_max_mb: int = 256
+
+    # Query embedding cache (per process, in front of the Redis cache)
+    query_cache_enabled: bool = True
+    query_cache_max_mb: int = 32
+    query_cache_ttl_s: float = 3600.0
+
+    # Retrieval for PPT context (same settings as the API)
+    retrieval_hybrid_enabled: bool = True
+    retrieval_candidates: int = 50
+    retrieval_rrf_k: int = 60
+    hnsw_ef_search: int = 100
+    hnsw_iterative_scan: str = "relaxed_order"  # off | strict_order | relaxed_order (pgvector 0.8+)
+    hnsw_max_scan_tuples: int = 20000
+    vector_storage: str = "vector"  # vector | halfvec | binary; must match the index built by migration 008
+    vector_rerank_candidates: int = 200
+
+    # PDF extraction
+    pdf_parallel_workers: int = 4
+    pdf_parallel_min_pages: int = 64
+    pdf_pages_per_shard: int = 16
+    pdf_page_timeout_s: float = 30.0
+
+    # Tabular (CSV/XLSX) chunking
+    tabular_chunk_rows: int = 50
+    tabular_chunk_chars: int = 2000
+
+    # Ingest pipeline
+    ingest_batch_size: int = 500
+    ingest_queue_size: int = 256
+
+    # Online re-embedding (app.tasks.reembed); throttled to leave Bedrock quota for ingest
+    reembed_batch_size: int = 256
+    reembed_concurrency: int = 2
+    reembed_pause_s: float = 0.5
+    reembed_lock_timeout: str = "5s"
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
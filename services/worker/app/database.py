@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.config import settings
@@ -7,5 +7,34 @@ engine = create_engine(settings.database_url_sync, echo=False)
 SessionLocal = sessionmaker(bind=engine)
 
 
+# Session-wide HNSW tuning, set once per pooled connection instead of a round trip per
+# search. With iterative scans (pgvector 0.8+) the index keeps returning neighbours until
+# the project filter has let enough rows through, instead of stopping after ef_search
+# candidates that may all belong to other projects. relaxed_order can return rows
+# slightly out of order; retrieval re-sorts. ef_search covers the deepest candidate list
+# retrieval asks for. Same statement in the API copy.
+HNSW_SETTINGS_SQL = """
+    SELECT set_config('hnsw.ef_search', %s, false),
+           set_config('hnsw.iterative_scan', %s, false),
+           set_config('hnsw.max_scan_tuples', %s, false)
+"""
+
+
+def hnsw_settings() -> tuple[str, str, str]:
+    ef_search = max(settings.hnsw_ef_search, settings.retrieval_candidates, settings.vector_rerank_candidates)
+    return str(ef_search), settings.hnsw_iterative_scan, str(settings.hnsw_max_scan_tuples)
+
+
+@event.listens_for(engine, "connect")
+def _configure_hnsw(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(HNSW_SETTINGS_SQL, hnsw_settings())
+    finally:
+        cursor.close()
+    # Committed so the pool's reset rollback does not undo it
+    dbapi_connection.commit()
+
+
 def get_session() -> Session:
     return SessionLocal()
@@ -0,0 +1,9 @@
+import io
+from typing import BinaryIO
+
+
+def as_stream(data: bytes | BinaryIO) -> BinaryIO:
+    """Parsers accept raw bytes or an open binary file; normalize to a file object."""
+    if isinstance(data, (bytes, bytearray)):
+        return io.BytesIO(data)
+    return data
@@ -1,14 +1,22 @@
 import csv
 import io
+from typing import BinaryIO, Iterator
 
+from app.chunker import chunk_rows
+from app.config import settings
+from app.parsers import as_stream
 
-def parse_csv(data: bytes) -> list[dict]:
-    """Parse CSV and return as single text block with metadata."""
-    text = data.decode("utf-8", errors="replace")
-    reader = csv.reader(io.StringIO(text))
-    rows = []
-    for row in reader:
-        rows.append(" | ".join(row))
-    if rows:
-        return [{"text": "\n".join(rows), "metadata": {"type": "csv"}}]
-    return []
+
+def _rows(reader: io.TextIOWrapper) -> Iterator[tuple[int, str]]:
+    for row_no, row in enumerate(csv.reader(reader), start=1):
+        line = " | ".join(row)
+        if line.strip(" |"):
+            yield row_no, line
+
+
+def parse_csv(data: bytes | BinaryIO) -> Iterator[dict]:
+    """Stream CSV rows and yield row-window chunks, each starting with the header row."""
+    reader = io.TextIOWrapper(as_stream(data), encoding="utf-8", errors="replace", newline="")
+    for text, row_start, row_end in chunk_rows(_rows(reader), settings.tabular_chunk_rows, settings.tabular_chunk_chars):
+        yield {"text": text, "metadata": {"type": "csv", "row_start": row_start, "row_end": row_end}, "chunked": True}
+    reader.detach()
@@ -1,12 +1,13 @@
-import io
+from typing import BinaryIO, Iterator
 
 from docx import Document
 
+from app.parsers import as_stream
 
-def parse_docx(data: bytes) -> list[dict]:
-    """Parse DOCX and return list of {text, metadata}."""
-    doc = Document(io.BytesIO(data))
-    paragraphs = []
+
+def parse_docx(data: bytes | BinaryIO) -> Iterator[dict]:
+    """Parse DOCX and yield {text, metadata} per blank-line separated section."""
+    doc = Document(as_stream(data))
     current_section = []
     section_idx = 0
 
@@ -14,19 +15,11 @@ def parse_docx(data: bytes) -> list[dict]:
         text = para.text.strip()
         if not text:
             if current_section:
-                paragraphs.append({
-                    "text": "\n".join(current_section),
-                    "metadata": {"section": section_idx + 1},
-                })
+                yield {"text": "\n".join(current_section), "metadata": {"section": section_idx + 1}}
                 current_section = []
                 section_idx += 1
             continue
         current_section.append(text)
 
     if current_section:
-        paragraphs.append({
-            "text": "\n".join(current_section),
-            "metadata": {"section": section_idx + 1},
-        })
-
-    return paragraphs if paragraphs else [{"text": "", "metadata": {}}]
+        yield {"text": "\n".join(current_section), "metadata": {"section": section_idx + 1}}
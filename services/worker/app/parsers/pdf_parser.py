@@ -1,13 +1,161 @@
-from pypdf import PdfReader
 import io
+import logging
+import mmap
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import BinaryIO, Callable, Iterator
+
+from pypdf import PdfReader
+
+from app.config import settings
+from app.parsers import as_stream
+
+logger = logging.getLogger(__name__)
+
+
+class _PageTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _PageTimeout()
+
+
+def _extract_page(page, index: int, timeout: float) -> str:
+    """Extract one page, giving up after timeout seconds (pool workers only: needs SIGALRM)."""
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return page.extract_text() or ""
+    except _PageTimeout:
+        logger.warning(f"PDF page {index + 1} exceeded {timeout}s, skipping")
+        return ""
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _extract_range(path: str, start: int, end: int, timeout: float) -> list[tuple[int, str]]:
+    """Pool worker: extract pages [start, end) from a memory-mapped PDF on disk."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        reader = PdfReader(mapped)
+        return [(i, _extract_page(reader.pages[i], i, timeout)) for i in range(start, end)]
+
+
+def _page_section(index: int, text: str) -> dict | None:
+    if text.strip():
+        return {"text": text, "metadata": {"page": index + 1}}
+    return None
+
+
+def _page_text(reader: PdfReader, index: int) -> str:
+    return reader.pages[index].extract_text() or ""
+
+
+def _parse_serial(open_reader: Callable[[], PdfReader]) -> Iterator[dict]:
+    """Extract pages in this process, each on a helper thread under the page timeout.
+
+    Ingest parses on a prefetch thread, where SIGALRM cannot be used. A page
+    that overruns is abandoned instead: its thread finishes in the background
+    and the remaining pages are read through a fresh reader, since the old one
+    is still in use.
+    """
+    timeout = settings.pdf_page_timeout_s
+    reader = open_reader()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-page")
+    try:
+        for i in range(len(reader.pages)):
+            future = executor.submit(_page_text, reader, i)
+            try:
+                text = future.result(timeout=timeout)
+            except FutureTimeout:
+                logger.warning(f"PDF page {i + 1} exceeded {timeout}s, skipping")
+                executor.shutdown(wait=False)
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-page")
+                reader = open_reader()
+                continue
+            section = _page_section(i, text)
+            if section:
+                yield section
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _parse_parallel(path: str, num_pages: int) -> Iterator[dict]:
+    """Shard page ranges across a process pool and yield pages in order."""
+    per_shard = settings.pdf_pages_per_shard
+    shards = [(start, min(start + per_shard, num_pages)) for start in range(0, num_pages, per_shard)]
+    workers = min(settings.pdf_parallel_workers, len(shards))
+    max_pending = workers * 2
+
+    # spawn rather than fork: the ingest process is multi-threaded by now
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending = deque()
+        remaining = iter(shards)
+        try:
+            while True:
+                for start, end in remaining:
+                    pending.append(pool.submit(_extract_range, path, start, end, settings.pdf_page_timeout_s))
+                    if len(pending) >= max_pending:
+                        break
+                if not pending:
+                    return
+                for i, text in pending.popleft().result():
+                    section = _page_section(i, text)
+                    if section:
+                        yield section
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _can_start_processes() -> bool:
+    # The flag ProcessPoolExecutor enforces. Celery's prefork children are daemonic
+    # only to billiard, so they pass and use the pool; PDF_PARALLEL_WORKERS=1 keeps
+    # extraction in process where starting processes is unwanted.
+    return not multiprocessing.current_process()._config.get("daemon")
+
+
+def parse_pdf(data: bytes | BinaryIO) -> Iterator[dict]:
+    """Parse PDF and yield {text, metadata} per page.
+
+    Large documents are extracted page-parallel in a process pool; small ones,
+    or with PDF_PARALLEL_WORKERS below 2, are extracted in this process. Both
+    skip a page that runs past PDF_PAGE_TIMEOUT_S.
+    """
+    stream = as_stream(data)
+    num_pages = len(PdfReader(stream).pages)
+    path = getattr(stream, "name", None)
+    if not (isinstance(path, str) and os.path.isfile(path)):
+        path = None
+
+    if (
+        settings.pdf_parallel_workers < 2
+        or num_pages < settings.pdf_parallel_min_pages
+        or not _can_start_processes()
+    ):
+        if path is not None:
+            yield from _parse_serial(lambda: PdfReader(path))
+        else:
+            # A reader abandoned after a timeout may still be reading; later readers need their own stream
+            stream.seek(0)
+            content = stream.read()
+            yield from _parse_serial(lambda: PdfReader(io.BytesIO(content)))
+        return
 
+    # Workers open the file themselves; only the path is sent to them
+    if path is not None:
+        yield from _parse_parallel(path, num_pages)
+        return
 
-def parse_pdf(data: bytes) -> list[dict]:
-    """Parse PDF and return list of {text, metadata} per page."""
-    reader = PdfReader(io.BytesIO(data))
-    pages = []
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text() or ""
-        if text.strip():
-            pages.append({"text": text, "metadata": {"page": i + 1}})
-    return pages
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+        stream.seek(0)
+        shutil.copyfileobj(stream, tmp)
+        tmp.flush()
+        yield from _parse_parallel(tmp.name, num_pages)
@@ -1,12 +1,13 @@
-import io
+from typing import BinaryIO, Iterator
 
 from pptx import Presentation
 
+from app.parsers import as_stream
 
-def parse_pptx(data: bytes) -> list[dict]:
-    """Parse PPTX and return list of {text, metadata} per slide."""
-    prs = Presentation(io.BytesIO(data))
-    slides = []
+
+def parse_pptx(data: bytes | BinaryIO) -> Iterator[dict]:
+    """Parse PPTX and yield {text, metadata} per slide."""
+    prs = Presentation(as_stream(data))
     for i, slide in enumerate(prs.slides):
         texts = []
         for shape in slide.shapes:
@@ -21,5 +22,4 @@ def parse_pptx(data: bytes) -> list[dict]:
                     if row_text.strip(" |"):
                         texts.append(row_text)
         if texts:
-            slides.append({"text": "\n".join(texts), "metadata": {"slide": i + 1}})
-    return slides
+            yield {"text": "\n".join(texts), "metadata": {"slide": i + 1}}
@@ -0,0 +1,23 @@
+import io
+from typing import BinaryIO, Iterator
+
+from app.parsers import as_stream
+
+BLOCK_CHARS = 64 * 1024
+
+
+def parse_txt(data: bytes | BinaryIO) -> Iterator[dict]:
+    """Parse plain text and yield it in line-aligned blocks of about BLOCK_CHARS."""
+    reader = io.TextIOWrapper(as_stream(data), encoding="utf-8", errors="replace", newline="")
+    block = []
+    size = 0
+    for line in reader:
+        block.append(line)
+        size += len(line)
+        if size >= BLOCK_CHARS:
+            yield {"text": "".join(block), "metadata": {"type": "text"}}
+            block, size = [], 0
+    text = "".join(block)
+    if text.strip():
+        yield {"text": text, "metadata": {"type": "text"}}
+    reader.detach()
@@ -1,21 +1,30 @@
-import io
+from typing import BinaryIO, Iterator
 
 from openpyxl import load_workbook
 
+from app.chunker import chunk_rows
+from app.config import settings
+from app.parsers import as_stream
 
-def parse_xlsx(data: bytes) -> list[dict]:
-    """Parse XLSX and return list of {text, metadata} per sheet."""
-    wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
-    sheets = []
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        rows = []
-        for row in ws.iter_rows(values_only=True):
-            cells = [str(c) if c is not None else "" for c in row]
-            line = " | ".join(cells)
-            if line.strip(" |"):
-                rows.append(line)
-        if rows:
-            sheets.append({"text": "\n".join(rows), "metadata": {"sheet": sheet_name}})
-    wb.close()
-    return sheets
+
+def _rows(ws) -> Iterator[tuple[int, str]]:
+    for row_no, row in enumerate(ws.iter_rows(min_row=1, values_only=True), start=1):
+        line = " | ".join(str(c) if c is not None else "" for c in row)
+        if line.strip(" |"):
+            yield row_no, line
+
+
+def parse_xlsx(data: bytes | BinaryIO) -> Iterator[dict]:
+    """Stream XLSX rows per sheet and yield row-window chunks, each starting with the header row."""
+    wb = load_workbook(as_stream(data), read_only=True, data_only=True)
+    try:
+        for sheet_name in wb.sheetnames:
+            windows = chunk_rows(_rows(wb[sheet_name]), settings.tabular_chunk_rows, settings.tabular_chunk_chars)
+            for text, row_start, row_end in windows:
+                yield {
+                    "text": text,
+                    "metadata": {"sheet": sheet_name, "row_start": row_start, "row_end": row_end},
+                    "chunked": True,
+                }
+    finally:
+        wb.close()
@@ -0,0 +1,75 @@
+import queue
+import threading
+from collections import deque
+from typing import Iterable, Iterator
+
+from app.services.bedrock_client import embed_iter
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def prefetch(iterable: Iterable, maxsize: int) -> Iterator:
+    """Run an iterator in a background thread, handing items over through a bounded queue.
+
+    The producer blocks once maxsize items are waiting, so memory stays bounded
+    by the queue rather than by the input. Producer exceptions are re-raised in
+    the consumer; closing the consumer stops the producer at its next item.
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+
+    def _put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce():
+        try:
+            for item in iterable:
+                if not _put(item):
+                    return
+            _put(_DONE)
+        except BaseException as e:
+            _put(_Failed(e))
+
+    thread = threading.Thread(target=_produce, name="ingest-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failed):
+                raise item.exc
+            yield item
+    finally:
+        stopped.set()
+        thread.join(timeout=5)
+
+
+def embed_stage(
+    chunks: Iterable[tuple[str, dict]], model_id: str | None = None, dimensions: int | None = None
+) -> Iterator[tuple[str, dict, list[float]]]:
+    """Attach embeddings to (text, metadata) chunks, preserving order.
+
+    Only the chunks currently in flight in embed_iter are held in memory.
+    """
+    held: deque = deque()
+
+    def _texts():
+        for chunk in chunks:
+            held.append(chunk)
+            yield chunk[0]
+
+    for embedding in embed_iter(_texts(), model_id=model_id, dimensions=dimensions):
+        chunk_text_val, metadata = held.popleft()
+        yield chunk_text_val, metadata, embedding
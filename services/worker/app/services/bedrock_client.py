@@ -1,9 +1,32 @@
 import json
+import logging
+import random
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError, ReadTimeoutError
 
 from app.config import settings
+from app.services import embedding_cache, query_cache, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+EMBED_WINDOW = 64
+
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+}
+THROTTLE_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException"}
 
 
 @lru_cache(maxsize=1)
@@ -12,11 +35,91 @@ def _get_bedrock_client():
     if settings.aws_access_key_id:
         kwargs["aws_access_key_id"] = settings.aws_access_key_id
         kwargs["aws_secret_access_key"] = settings.aws_secret_access_key
+    kwargs["config"] = Config(
+        max_pool_connections=settings.bedrock_max_pool_connections,
+        connect_timeout=settings.bedrock_connect_timeout_s,
+        read_timeout=settings.bedrock_read_timeout_s,
+        tcp_keepalive=True,
+        # Retries happen per request in _call_with_retry, under the shared rate limit
+        retries={"total_max_attempts": 1, "mode": "standard"},
+    )
     return boto3.client("bedrock-runtime", **kwargs)
 
 
-def converse(messages: list[dict], system: str | None = None, max_tokens: int = 4096) -> str:
-    """Call Claude via Bedrock Converse API (sync)."""
+@lru_cache(maxsize=None)
+def _adaptive_limit(bucket: str) -> rate_limiter.AdaptiveLimit:
+    maximum = settings.embed_concurrency if bucket == "embed" else settings.converse_concurrency
+    return rate_limiter.AdaptiveLimit(maximum)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, ClientError):
+        return exc.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+    return isinstance(exc, (ConnectionError, ReadTimeoutError))
+
+
+def _is_throttle(exc: Exception) -> bool:
+    return isinstance(exc, ClientError) and exc.response.get("Error", {}).get("Code") in THROTTLE_ERROR_CODES
+
+
+def _call_with_retry(bucket: str, fn, *args):
+    """Call Bedrock under the shared rate limit and this process's adaptive
+    concurrency limit, retrying transient errors with jittered backoff."""
+    limit = _adaptive_limit(bucket)
+    max_retries = settings.embed_max_retries if bucket == "embed" else settings.converse_max_retries
+    for attempt in range(max_retries + 1):
+        try:
+            with limit:
+                rate_limiter.acquire(bucket)
+                result = fn(*args)
+            limit.on_success()
+            return result
+        except Exception as e:
+            if _is_throttle(e):
+                limit.on_throttle()
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = random.uniform(0, min(20.0, 0.5 * 2 ** attempt))
+            logger.warning(f"Bedrock {bucket} attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+
+# Marks the end of a prompt prefix for Bedrock prompt caching. Claude only caches
+# prefixes of at least 1,024 tokens; shorter ones are sent uncached at no extra cost.
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
+def with_cache_point(blocks: list[dict]) -> list[dict]:
+    """Content blocks followed by a cache checkpoint, when prompt caching is enabled."""
+    return [*blocks, CACHE_POINT] if settings.bedrock_prompt_cache_enabled else blocks
+
+
+def _record_usage(usage: dict | None, response_usage: dict, metrics: dict):
+    """Log a Converse call's token counts, including prompt cache reads and writes,
+    and copy them into usage when the caller passed a dict to collect them."""
+    counts = {
+        "input_tokens": response_usage.get("inputTokens", 0),
+        "output_tokens": response_usage.get("outputTokens", 0),
+        "cache_read_tokens": response_usage.get("cacheReadInputTokens", 0),
+        "cache_write_tokens": response_usage.get("cacheWriteInputTokens", 0),
+        "latency_ms": metrics.get("latencyMs"),
+    }
+    logger.info(
+        f"Bedrock converse: {counts['input_tokens']} input tokens ({counts['cache_read_tokens']} cache read, "
+        f"{counts['cache_write_tokens']} cache write), {counts['output_tokens']} output, {counts['latency_ms']} ms"
+    )
+    if usage is not None:
+        usage.update(counts)
+
+
+def converse(
+    messages: list[dict], system: str | list[dict] | None = None, max_tokens: int = 4096, usage: dict | None = None
+) -> str:
+    """Call Claude via Bedrock Converse API (sync).
+
+    system is a string or a list of content blocks (e.g. ending in CACHE_POINT).
+    Token counts are filled into usage, if given.
+    """
     client = _get_bedrock_client()
 
     kwargs = {
@@ -25,24 +128,109 @@ def converse(messages: list[dict], system: str | None = None, max_tokens: int =
         "inferenceConfig": {"maxTokens": max_tokens, "temperature": 0.3},
     }
     if system:
-        kwargs["system"] = [{"text": system}]
+        kwargs["system"] = [{"text": system}] if isinstance(system, str) else system
 
-    response = client.converse(**kwargs)
+    response = _call_with_retry("converse", lambda: client.converse(**kwargs))
+    _record_usage(usage, response.get("usage", {}), response.get("metrics", {}))
     return response["output"]["message"]["content"][0]["text"]
 
 
-def embed(text: str) -> list[float]:
-    """Embed text via Bedrock Titan Embed V2 (sync)."""
+def _invoke_embed(text: str, model_id: str, dimensions: int) -> list[float]:
     client = _get_bedrock_client()
-    body = json.dumps({"inputText": text, "dimensions": 1024, "normalize": True})
-    response = client.invoke_model(modelId=settings.bedrock_embed_model_id, body=body, contentType="application/json")
+    body = json.dumps({"inputText": text, "dimensions": dimensions, "normalize": True})
+    response = client.invoke_model(modelId=model_id, body=body, contentType="application/json")
     result = json.loads(response["body"].read())
     return result["embedding"]
 
 
-def embed_batch(texts: list[str], batch_size: int = 20) -> list[list[float]]:
-    """Embed multiple texts, calling one at a time (Titan doesn't support batch)."""
-    embeddings = []
-    for text in texts:
-        embeddings.append(embed(text))
-    return embeddings
+def embed(text: str, model_id: str | None = None, dimensions: int | None = None) -> list[float]:
+    """Embed text via Bedrock Titan Embed V2 (sync), consulting the shared cache first.
+
+    model_id and dimensions default to settings; callers searching or writing
+    vectors pass the active pair from embedding_config.
+    """
+    model_id = model_id or settings.bedrock_embed_model_id
+    dimensions = dimensions or settings.embed_dimensions
+    cached = embedding_cache.get(text, model_id, dimensions)
+    if cached is not None:
+        return cached
+    embedding = _call_with_retry("embed", _invoke_embed, text, model_id, dimensions)
+    embedding_cache.put(text, embedding, model_id, dimensions)
+    return embedding
+
+
+def embed_query(text: str, model_id: str | None = None, dimensions: int | None = None) -> list[float]:
+    """Embed a search query, checking this process's query cache before the shared one."""
+    model_id = model_id or settings.bedrock_embed_model_id
+    dimensions = dimensions or settings.embed_dimensions
+    cached = query_cache.get(text, model_id, dimensions)
+    if cached is not None:
+        return cached
+    embedding = embed(text, model_id, dimensions)
+    query_cache.put(text, embedding, model_id, dimensions)
+    return embedding
+
+
+def _embed_and_cache(text: str, model_id: str, dimensions: int) -> list[float]:
+    embedding = _call_with_retry("embed", _invoke_embed, text, model_id, dimensions)
+    embedding_cache.put(text, embedding, model_id, dimensions)
+    return embedding
+
+
+def _windows(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    it = iter(items)
+    while window := list(islice(it, size)):
+        yield window
+
+
+def _result(entry: Future | list[float]) -> list[float]:
+    return entry.result() if isinstance(entry, Future) else entry
+
+
+def embed_iter(
+    texts: Iterable[str],
+    concurrency: int | None = None,
+    model_id: str | None = None,
+    dimensions: int | None = None,
+) -> Iterator[list[float]]:
+    """Embed a stream of texts with a bounded pool of in-flight requests.
+
+    Titan takes one input per call, so throughput comes from concurrency.
+    Input is read in windows: cached texts skip Bedrock, duplicates within a
+    window are embedded once, and only a few windows are pending at a time.
+    Embeddings are yielded in input order; each text is retried independently.
+    """
+    workers = max(1, concurrency or settings.embed_concurrency)
+    max_pending = workers * 4
+    model_id = model_id or settings.bedrock_embed_model_id
+    dimensions = dimensions or settings.embed_dimensions
+
+    # boto3 clients are thread-safe, but creating one is not
+    _get_bedrock_client()
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed")
+    pending: deque = deque()
+    try:
+        for window in _windows(texts, EMBED_WINDOW):
+            submitted: dict[str, Future] = {}
+            for text, cached in zip(window, embedding_cache.get_many(window, model_id, dimensions)):
+                if cached is not None:
+                    pending.append(cached)
+                    continue
+                key = embedding_cache.normalize_text(text)
+                if key not in submitted:
+                    submitted[key] = pool.submit(_embed_and_cache, text, model_id, dimensions)
+                pending.append(submitted[key])
+            while len(pending) > max_pending:
+                yield _result(pending.popleft())
+        while pending:
+            yield _result(pending.popleft())
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def embed_batch(
+    texts: list[str], concurrency: int | None = None, model_id: str | None = None, dimensions: int | None = None
+) -> list[list[float]]:
+    """Embed a list of texts concurrently; see embed_iter."""
+    return list(embed_iter(texts, concurrency, model_id, dimensions))
@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import time
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "embcache"
+LRU_KEY = f"{KEY_PREFIX}:lru"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+ENTRY_OVERHEAD_BYTES = 160
+# Titan returns float64 JSON numbers; storing them as-is keeps a hit identical to the miss that wrote it
+VALUE_DTYPE = "<f8"
+
+
+@lru_cache(maxsize=1)
+def _get_redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.redis_url)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, model_id: str, dimensions: int) -> str:
+    digest = hashlib.sha256(f"{model_id}\x00{dimensions}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+    # v2: float64 payloads; float32 entries written under the old keys age out of the LRU
+    return f"{KEY_PREFIX}:v2:{digest}"
+
+
+def _max_entries(dimensions: int) -> int:
+    return settings.embed_cache_max_mb * 1024 * 1024 // (dimensions * np.dtype(VALUE_DTYPE).itemsize + ENTRY_OVERHEAD_BYTES)
+
+
+def get_many(texts: list[str], model_id: str, dimensions: int) -> list[list[float] | None]:
+    """Look up cached embeddings; misses come back as None. Fails open on Redis errors."""
+    if not settings.embed_cache_enabled or not texts:
+        return [None] * len(texts)
+
+    keys = [cache_key(t, model_id, dimensions) for t in texts]
+    try:
+        client = _get_redis()
+        values = client.mget(keys)
+        hits = [k for k, v in zip(keys, values) if v is not None]
+        pipe = client.pipeline(transaction=False)
+        if hits:
+            now = time.time()
+            pipe.zadd(LRU_KEY, {k: now for k in hits})
+            pipe.hincrby(STATS_KEY, "hits", len(hits))
+        if len(hits) < len(keys):
+            pipe.hincrby(STATS_KEY, "misses", len(keys) - len(hits))
+            # A payload evicted by Redis itself leaves its LRU member behind
+            pipe.zrem(LRU_KEY, *[k for k, v in zip(keys, values) if v is None])
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache unavailable: {e}")
+        return [None] * len(texts)
+
+    return [np.frombuffer(v, dtype=VALUE_DTYPE).tolist() if v is not None else None for v in values]
+
+
+def put_many(items: list[tuple[str, list[float]]], model_id: str, dimensions: int):
+    """Store embeddings and evict least recently used entries beyond the size budget."""
+    if not settings.embed_cache_enabled or not items:
+        return
+
+    try:
+        client = _get_redis()
+        now = time.time()
+        pipe = client.pipeline(transaction=False)
+        for text, embedding in items:
+            key = cache_key(text, model_id, dimensions)
+            pipe.set(key, np.asarray(embedding, dtype=VALUE_DTYPE).tobytes())
+            pipe.zadd(LRU_KEY, {key: now})
+        pipe.zcard(LRU_KEY)
+        size = pipe.execute()[-1]
+
+        excess = size - _max_entries(dimensions)
+        if excess > 0:
+            oldest = client.zrange(LRU_KEY, 0, excess - 1)
+            if oldest:
+                # Member and payload go together; members whose payload is already gone are not counted
+                pipe = client.pipeline(transaction=True)
+                pipe.zrem(LRU_KEY, *oldest)
+                pipe.delete(*oldest)
+                evicted = pipe.execute()[-1]
+                if evicted:
+                    client.hincrby(STATS_KEY, "evictions", evicted)
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache unavailable: {e}")
+
+
+def get(text: str, model_id: str, dimensions: int) -> list[float] | None:
+    return get_many([text], model_id, dimensions)[0]
+
+
+def put(text: str, embedding: list[float], model_id: str, dimensions: int):
+    put_many([(text, embedding)], model_id, dimensions)
+
+
+def stats() -> dict:
+    """Hit/miss/eviction counters shared by every API and worker process.
+
+    Reports the error instead of the counters when Redis is unreachable.
+    """
+    try:
+        client = _get_redis()
+        counters = {k.decode(): int(v) for k, v in client.hgetall(STATS_KEY).items()}
+        entries = client.zcard(LRU_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache unavailable: {e}")
+        return {"error": str(e)}
+    return {
+        "hits": counters.get("hits", 0),
+        "misses": counters.get("misses", 0),
+        "evictions": counters.get("evictions", 0),
+        "entries": entries,
+    }
@@ -0,0 +1,14 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+ACTIVE_SQL = "SELECT model, dimensions FROM embedding_config WHERE id = 1"
+
+
+def active(session: Session) -> tuple[str, int]:
+    """The (model, dimensions) pair vectors.embedding currently holds and is searched with."""
+    row = session.execute(text(ACTIVE_SQL)).fetchone()
+    if row is None:
+        return settings.bedrock_embed_model_id, settings.embed_dimensions
+    return row.model, row.dimensions
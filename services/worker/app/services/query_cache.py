@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from app.config import settings
+from app.services.embedding_cache import cache_key
+
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class QueryEmbeddingCache:
+    """In-process LRU of query embeddings with a TTL and a memory budget.
+
+    Sits in front of the shared Redis embedding cache, so a repeated query
+    costs a dict lookup instead of a Redis or Bedrock round trip.
+    """
+
+    def __init__(self, max_bytes: int, ttl_s: float):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> list[float] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1].tolist()
+
+    def put(self, key: str, embedding: list[float]):
+        value = np.asarray(embedding, dtype=np.float32)
+        size = value.nbytes + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        _, value = self._entries.pop(key)
+        self.bytes -= value.nbytes + ENTRY_OVERHEAD_BYTES
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+            }
+
+
+@lru_cache(maxsize=1)
+def _get_cache() -> QueryEmbeddingCache:
+    return QueryEmbeddingCache(settings.query_cache_max_mb * 1024 * 1024, settings.query_cache_ttl_s)
+
+
+def get(text: str, model_id: str, dimensions: int) -> list[float] | None:
+    if not settings.query_cache_enabled:
+        return None
+    return _get_cache().get(cache_key(text, model_id, dimensions))
+
+
+def put(text: str, embedding: list[float], model_id: str, dimensions: int):
+    if settings.query_cache_enabled:
+        _get_cache().put(cache_key(text, model_id, dimensions), embedding)
+
+
+def stats() -> dict:
+    """Counters for this process only."""
+    return _get_cache().stats()
@@ -33,6 +33,11 @@ def download_file(bucket: str, object_name: str) -> bytes:
         response.release_conn()
 
 
+def download_to_path(bucket: str, object_name: str, path: str):
+    """Stream an object to a local file without holding it in memory."""
+    _get_client().fget_object(bucket, object_name, path)
+
+
 def upload_file(bucket: str, object_name: str, data: bytes, content_type: str = "application/octet-stream") -> str:
     client = _get_client()
     client.put_object(bucket, object_name, io.BytesIO(data), len(data), content_type=content_type)
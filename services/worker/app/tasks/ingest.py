@@ -1,9 +1,14 @@
-import json
 import logging
-import uuid
+import os
+import tempfile
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable, Iterator
 
 from sqlalchemy import text
 
+from app.bulk_writer import BulkWriter, content_hash, copy_rows, encode_int4, encode_jsonb, encode_uuid
 from app.celery_app import celery
 from app.chunker import chunk_text
 from app.config import settings
@@ -12,9 +17,11 @@ from app.parsers.csv_parser import parse_csv
 from app.parsers.docx_parser import parse_docx
 from app.parsers.pdf_parser import parse_pdf
 from app.parsers.pptx_parser import parse_pptx
+from app.parsers.txt_parser import parse_txt
 from app.parsers.xlsx_parser import parse_xlsx
-from app.services.bedrock_client import embed
-from app.services.storage_client import download_file
+from app.pipeline import embed_stage, prefetch
+from app.services import embedding_config
+from app.services.storage_client import download_to_path
 
 logger = logging.getLogger(__name__)
 
@@ -24,18 +31,159 @@ PARSERS = {
     ".xlsx": parse_xlsx,
     ".docx": parse_docx,
     ".csv": parse_csv,
-    ".txt": lambda data: [{"text": data.decode("utf-8", errors="replace"), "metadata": {"type": "text"}}],
+    ".txt": parse_txt,
 }
 
 
+def _bump_corpus_version(session, project_id: str):
+    """Invalidate the project's cached chat answers; its searchable content changed.
+
+    Same statement as BUMP_CORPUS_VERSION_SQL in the API's answer_cache.
+    """
+    session.execute(
+        text("""
+            WITH p AS (
+                UPDATE projects SET corpus_version = corpus_version + 1 WHERE id = :project_id
+                RETURNING id, corpus_version
+            )
+            DELETE FROM answer_cache a USING p WHERE a.project_id = p.id AND a.corpus_version < p.corpus_version
+        """),
+        {"project_id": project_id},
+    )
+
+
+def _iter_chunks(sections: Iterable[dict]) -> Iterator[tuple[str, dict]]:
+    for section in sections:
+        metadata = section.get("metadata", {})
+        # Tabular parsers emit ready-made row windows; prose still needs splitting
+        pieces = [section.get("text", "")] if section.get("chunked") else chunk_text(section.get("text", ""))
+        for chunk_text_val in pieces:
+            if chunk_text_val.strip():
+                yield chunk_text_val, metadata
+
+
+def _clone_duplicate(session, file_id: str, project_id: str, sha256: str, extension: str) -> int | None:
+    """Copy chunks and vectors from a ready file with identical bytes owned by the same user.
+
+    The extension must match too: it picks the parser, so the same bytes as
+    .csv and as .txt are chunked differently.
+
+    Returns the number of chunks cloned, or None when there is no such file.
+    """
+    row = session.execute(
+        text("""
+            SELECT src.id, src.project_id
+            FROM files src
+            JOIN projects src_p ON src_p.id = src.project_id
+            JOIN projects p ON p.user_id = src_p.user_id
+            WHERE p.id = :project_id AND src.sha256 = :sha256 AND src.extension = :extension
+              AND src.status = 'ready' AND src.id <> :file_id
+            ORDER BY (src.project_id = :project_id) DESC, src.created_at DESC
+            LIMIT 1
+        """),
+        {"project_id": project_id, "sha256": sha256, "extension": extension, "file_id": file_id},
+    ).fetchone()
+    if row is None:
+        return None
+
+    source_id, source_project_id = row
+    # Discard rows from any earlier partial run of this file
+    session.execute(text("DELETE FROM chunks WHERE file_id = :file_id"), {"file_id": file_id})
+    result = session.execute(
+        text("""
+            INSERT INTO chunks (id, file_id, ordinal, text, content_hash, metadata_json)
+            SELECT gen_random_uuid(), :file_id, ordinal, text, content_hash, metadata_json
+            FROM chunks
+            WHERE file_id = :source_id
+        """),
+        {"file_id": file_id, "source_id": source_id},
+    )
+    session.execute(
+        text("""
+            INSERT INTO vectors (id, chunk_id, project_id, embedding, embed_model, embed_dim)
+            SELECT gen_random_uuid(), dst.id, :project_id, v.embedding, v.embed_model, v.embed_dim
+            FROM chunks src
+            JOIN vectors v ON v.chunk_id = src.id AND v.project_id = :source_project_id
+            JOIN chunks dst ON dst.file_id = :file_id AND dst.ordinal = src.ordinal
+            WHERE src.file_id = :source_id
+        """),
+        {"file_id": file_id, "project_id": project_id, "source_id": source_id, "source_project_id": source_project_id},
+    )
+    logger.info(f"File {file_id} is identical to ready file {source_id}, cloned {result.rowcount} chunks")
+    return result.rowcount
+
+
+@contextmanager
+def _source_chunks(storage_path: str, extension: str, parser, skip: int = 0):
+    """Download a file to disk and yield its (text, metadata) chunks from a prefetch queue."""
+    with tempfile.TemporaryDirectory(prefix="ingest-") as tmp_dir:
+        # Download from MinIO to disk rather than into memory
+        local_path = os.path.join(tmp_dir, f"source{extension}")
+        download_to_path(settings.minio_bucket_uploads, storage_path, local_path)
+
+        # Parse and chunk in a background thread feeding a bounded queue
+        with open(local_path, "rb") as source:
+            chunks = prefetch(islice(_iter_chunks(parser(source)), skip, None), settings.ingest_queue_size)
+            try:
+                yield chunks
+            finally:
+                chunks.close()
+
+
+KEEP_TABLE = "reingest_keep"
+KEEP_COLUMNS = ["chunk_id", "ordinal", "metadata_json"]
+
+
+def _move_kept(session, rows: list[tuple]):
+    """Give unchanged chunks their new ordinal and metadata; their vectors stay as they are."""
+    if not rows:
+        return
+    session.execute(text(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {KEEP_TABLE} (
+            chunk_id uuid, ordinal integer, metadata_json jsonb
+        ) ON COMMIT DELETE ROWS
+    """))
+    copy_rows(session, KEEP_TABLE, KEEP_COLUMNS, rows)
+    session.execute(text(f"""
+        UPDATE chunks c SET ordinal = k.ordinal, metadata_json = k.metadata_json
+        FROM {KEEP_TABLE} k WHERE c.id = k.chunk_id
+    """))
+    session.commit()
+    rows.clear()
+
+
+def _drop_parked(session, file_id: str, project_id: str) -> int:
+    """Delete a re-ingest's parked (negative-ordinal) chunks and their vectors.
+
+    Vectors go first by project, so the delete touches one partition rather than
+    cascading into every one.
+    """
+    session.execute(
+        text("""
+            DELETE FROM vectors WHERE project_id = :project_id
+            AND chunk_id IN (SELECT id FROM chunks WHERE file_id = :id AND ordinal < 0)
+        """),
+        {"project_id": project_id, "id": file_id},
+    )
+    return session.execute(
+        text("DELETE FROM chunks WHERE file_id = :id AND ordinal < 0"), {"id": file_id}
+    ).rowcount
+
+
 @celery.task(name="app.tasks.ingest.ingest_file", bind=True, max_retries=3)
 def ingest_file(self, file_id: str):
-    """Download file from MinIO, parse, chunk, embed, store vectors."""
+    """Download file from MinIO, parse, chunk, embed, store vectors.
+
+    Progress is committed in batches; a retry resumes after files.ingest_checkpoint.
+    """
     session = get_session()
     try:
         # Get file record
         result = session.execute(
-            text("SELECT id, project_id, storage_path, extension, status FROM files WHERE id = :id"),
+            text("""
+                SELECT id, project_id, storage_path, extension, status, sha256, ingest_checkpoint
+                FROM files WHERE id = :id
+            """),
             {"id": file_id},
         )
         row = result.fetchone()
@@ -43,16 +191,23 @@ def ingest_file(self, file_id: str):
             logger.error(f"File {file_id} not found")
             return
 
-        file_id_val, project_id, storage_path, extension, status = row
+        file_id_val, project_id, storage_path, extension, status, sha256, checkpoint = row
+        resume_from = checkpoint + 1 if checkpoint is not None else 0
 
         # Update status to processing
         session.execute(text("UPDATE files SET status = 'processing' WHERE id = :id"), {"id": file_id})
         session.commit()
 
-        # Download from MinIO
-        data = download_file(settings.minio_bucket_uploads, storage_path)
+        # Byte-identical file already ingested: copy its rows instead of calling Bedrock
+        cloned = _clone_duplicate(session, file_id, str(project_id), sha256, extension)
+        if cloned is not None:
+            session.execute(
+                text("UPDATE files SET status = 'ready', ingest_checkpoint = NULL WHERE id = :id"), {"id": file_id}
+            )
+            _bump_corpus_version(session, str(project_id))
+            session.commit()
+            return
 
-        # Parse
         parser = PARSERS.get(extension)
         if parser is None:
             logger.error(f"No parser for {extension}")
@@ -60,65 +215,138 @@ def ingest_file(self, file_id: str):
             session.commit()
             return
 
-        sections = parser(data)
+        # Embed with a bounded pool of in-flight requests and write in checkpointed COPY batches.
+        # Chunking is deterministic, so chunks up to the checkpoint are skipped unembedded.
+        # A re-embed that flips dimensions mid-ingest fails the next batch; the retry picks up the new pair.
+        if resume_from:
+            logger.info(f"Resuming ingest of file {file_id} at chunk {resume_from}")
+        model_id, dimensions = embedding_config.active(session)
+        with _source_chunks(storage_path, extension, parser, skip=resume_from) as chunks:
+            writer = BulkWriter(session, file_id, str(project_id), model_id, dimensions)
+            embedded = embed_stage(chunks, model_id, dimensions)
+            for ordinal, (chunk_text_val, metadata, embedding) in enumerate(embedded, start=resume_from):
+                writer.add(ordinal, chunk_text_val, metadata, embedding)
+            writer.flush()
 
-        # Chunk and embed
-        chunk_ordinal = 0
-        for section in sections:
-            text_content = section.get("text", "")
-            metadata = section.get("metadata", {})
-            chunks = chunk_text(text_content)
+        # Drop chunks beyond the end left by an earlier run, then mark ready
+        total = resume_from + writer.written
+        session.execute(
+            text("DELETE FROM chunks WHERE file_id = :id AND ordinal >= :total"), {"id": file_id, "total": total}
+        )
+        session.execute(
+            text("UPDATE files SET status = 'ready', ingest_checkpoint = NULL WHERE id = :id"), {"id": file_id}
+        )
+        _bump_corpus_version(session, str(project_id))
+        session.commit()
+        logger.info(f"Ingested file {file_id}: {total} chunks ({writer.written} embedded this run)")
 
-            for chunk_text_val in chunks:
-                if not chunk_text_val.strip():
+    except Exception as e:
+        session.rollback()
+        logger.exception(f"Error ingesting file {file_id}: {e}")
+        session.execute(text("UPDATE files SET status = 'error' WHERE id = :id"), {"id": file_id})
+        session.commit()
+        raise self.retry(exc=e, countdown=30)
+    finally:
+        session.close()
+
+
+@celery.task(name="app.tasks.ingest.reingest_file", bind=True, max_retries=3)
+def reingest_file(self, file_id: str):
+    """Re-ingest a replaced file, embedding only chunks whose text changed.
+
+    Existing chunks are matched to the new chunk stream by content hash. Matches
+    are moved to their new ordinal with their vector intact; the rest are embedded
+    and written as usual, and old chunks left unmatched are deleted at the end.
+    """
+    session = get_session()
+    project_id = None
+    try:
+        row = session.execute(
+            text("SELECT project_id, storage_path, extension FROM files WHERE id = :id"), {"id": file_id}
+        ).fetchone()
+        if row is None:
+            logger.error(f"File {file_id} not found")
+            return
+        project_id, storage_path, extension = row
+
+        parser = PARSERS.get(extension)
+        if parser is None:
+            logger.error(f"No parser for {extension}")
+            session.execute(text("UPDATE files SET status = 'error' WHERE id = :id"), {"id": file_id})
+            session.commit()
+            return
+
+        # Park the current chunks below every ordinal in use, so new ordinals
+        # 0..n can be assigned without tripping the (file_id, ordinal) key
+        session.execute(
+            text("""
+                UPDATE chunks SET ordinal = ordinal - s.shift
+                FROM (
+                    SELECT max(ordinal) - min(ordinal) + greatest(max(ordinal), 0) + 2 AS shift
+                    FROM chunks WHERE file_id = :id
+                ) s
+                WHERE file_id = :id
+            """),
+            {"id": file_id},
+        )
+        session.execute(
+            text("UPDATE files SET status = 'processing', ingest_checkpoint = NULL WHERE id = :id"), {"id": file_id}
+        )
+        session.commit()
+
+        existing: dict[str, deque] = defaultdict(deque)
+        for chunk_id, chunk_hash in session.execute(
+            text("SELECT id, content_hash FROM chunks WHERE file_id = :id ORDER BY ordinal"), {"id": file_id}
+        ):
+            existing[chunk_hash].append(chunk_id)
+
+        kept: list[tuple] = []
+        kept_total = 0
+        fresh_ordinals: deque = deque()
+
+        def _fresh(chunks):
+            nonlocal kept_total
+            for ordinal, (chunk_text_val, metadata) in enumerate(chunks):
+                matches = existing.get(content_hash(chunk_text_val))
+                if matches:
+                    kept.append((encode_uuid(matches.popleft()), encode_int4(ordinal), encode_jsonb(metadata)))
+                    kept_total += 1
+                    if len(kept) >= settings.ingest_batch_size:
+                        _move_kept(session, kept)
                     continue
+                fresh_ordinals.append(ordinal)
+                yield chunk_text_val, metadata
+
+        model_id, dimensions = embedding_config.active(session)
+        with _source_chunks(storage_path, extension, parser) as chunks:
+            # New ordinals arrive out of order around kept chunks, so they are no resume point
+            writer = BulkWriter(session, file_id, str(project_id), model_id, dimensions, checkpoint=False)
+            for chunk_text_val, metadata, embedding in embed_stage(_fresh(chunks), model_id, dimensions):
+                writer.add(fresh_ordinals.popleft(), chunk_text_val, metadata, embedding)
+            writer.flush()
+            _move_kept(session, kept)
 
-                chunk_id = str(uuid.uuid4())
-
-                # Insert chunk
-                session.execute(
-                    text("""
-                        INSERT INTO chunks (id, file_id, ordinal, text, metadata_json)
-                        VALUES (:id, :file_id, :ordinal, :text, :metadata::jsonb)
-                    """),
-                    {
-                        "id": chunk_id,
-                        "file_id": file_id,
-                        "ordinal": chunk_ordinal,
-                        "text": chunk_text_val,
-                        "metadata": json.dumps(metadata),
-                    },
-                )
-
-                # Embed
-                embedding = embed(chunk_text_val)
-                embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
-
-                # Insert vector
-                session.execute(
-                    text("""
-                        INSERT INTO vectors (id, chunk_id, project_id, embedding)
-                        VALUES (:id, :chunk_id, :project_id, :embedding::vector)
-                    """),
-                    {
-                        "id": str(uuid.uuid4()),
-                        "chunk_id": chunk_id,
-                        "project_id": str(project_id),
-                        "embedding": embedding_str,
-                    },
-                )
-
-                chunk_ordinal += 1
-
-        # Update file status
-        session.execute(text("UPDATE files SET status = 'ready' WHERE id = :id"), {"id": file_id})
+        # Whatever is still parked was not matched by the new version
+        removed = _drop_parked(session, file_id, str(project_id))
+        session.execute(
+            text("UPDATE files SET status = 'ready', ingest_checkpoint = NULL WHERE id = :id"), {"id": file_id}
+        )
+        _bump_corpus_version(session, str(project_id))
         session.commit()
-        logger.info(f"Ingested file {file_id}: {chunk_ordinal} chunks")
+        logger.info(
+            f"Re-ingested file {file_id}: kept {kept_total}, embedded {writer.written}, removed {removed} chunks"
+        )
 
     except Exception as e:
         session.rollback()
-        logger.exception(f"Error ingesting file {file_id}: {e}")
-        session.execute(text("UPDATE files SET status = 'error' WHERE id = :id"), {"id": file_id})
+        logger.exception(f"Error re-ingesting file {file_id}: {e}")
+        # Parked chunks are the old version; leaving them would mix both versions in search.
+        # A retry re-parks what was written and still reuses those vectors.
+        if project_id is not None:
+            _drop_parked(session, file_id, str(project_id))
+        session.execute(
+            text("UPDATE files SET status = 'error', ingest_checkpoint = NULL WHERE id = :id"), {"id": file_id}
+        )
         session.commit()
         raise self.retry(exc=e, countdown=30)
     finally:
@@ -8,36 +8,38 @@ from app.celery_app import celery
 from app.config import settings
 from app.database import get_session
 from app.ppt_builder import build_pptx
-from app.services.bedrock_client import converse, embed
+from app.services import embedding_config, retrieval
+from app.services.bedrock_client import converse, embed_query, with_cache_point
 from app.services.storage_client import upload_file
 
 logger = logging.getLogger(__name__)
 
+OUTLINE_SYSTEM_PROMPT = """You are a presentation designer. Return only valid JSON, no markdown formatting.
+
+Return the outline in this format:
+{
+  "title": "Presentation Title",
+  "slides": [
+    {
+      "title": "Slide Title",
+      "bullet_points": ["Point 1", "Point 2", "Point 3"],
+      "speaker_notes": "Notes for the presenter"
+    }
+  ]
+}"""
+
 
 def _get_rag_context(session, project_id: str, topic: str, top_k: int = 10) -> str:
     """Retrieve relevant chunks for PPT context."""
-    embedding = embed(topic)
-    embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
-
-    result = session.execute(
-        text("""
-            SELECT c.text, f.original_name
-            FROM vectors v
-            JOIN chunks c ON v.chunk_id = c.id
-            JOIN files f ON c.file_id = f.id
-            WHERE v.project_id = :project_id
-            ORDER BY v.embedding <=> :embedding::vector
-            LIMIT :top_k
-        """),
-        {"project_id": project_id, "embedding": embedding_str, "top_k": top_k},
-    )
-    rows = result.fetchall()
+    embedding = embed_query(topic, *embedding_config.active(session))
+    rows = retrieval.search(session, project_id, topic, embedding, top_k)
     if not rows:
         return "No project documents available."
 
+    # Document order, so the same chunks always produce the same (cacheable) prompt text
     parts = []
-    for chunk_text, file_name in rows:
-        parts.append(f"[Source: {file_name}]\n{chunk_text}")
+    for row in sorted(rows, key=lambda r: (r.file_name, r.ordinal)):
+        parts.append(f"[Source: {row.file_name}]\n{row.text}")
     return "\n\n---\n\n".join(parts)
 
 
@@ -70,30 +72,17 @@ def generate_ppt(self, artifact_id: str, params: dict):
         # Get RAG context
         context = _get_rag_context(session, str(project_id), topic)
 
-        # Step 1: Generate outline
+        # Step 1: Generate outline. The JSON instructions and the project context come
+        # first with cache checkpoints, so another deck on the topic reuses them.
+        context_block = {"text": f"Use the following project context for content:\n{context}"}
         outline_prompt = f"""Create a presentation outline with exactly {num_slides} slides.
 Topic: {topic}
 Audience: {audience}
-Style: {style}
-
-Use the following project context for content:
-{context}
-
-Return ONLY valid JSON in this format:
-{{
-  "title": "Presentation Title",
-  "slides": [
-    {{
-      "title": "Slide Title",
-      "bullet_points": ["Point 1", "Point 2", "Point 3"],
-      "speaker_notes": "Notes for the presenter"
-    }}
-  ]
-}}"""
+Style: {style}"""
 
         outline_response = converse(
-            messages=[{"role": "user", "content": [{"text": outline_prompt}]}],
-            system="You are a presentation designer. Return only valid JSON, no markdown formatting.",
+            messages=[{"role": "user", "content": [*with_cache_point([context_block]), {"text": outline_prompt}]}],
+            system=with_cache_point([{"text": OUTLINE_SYSTEM_PROMPT}]),
             max_tokens=4096,
         )
 
@@ -0,0 +1,222 @@
+import logging
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.bulk_writer import copy_rows, encode_uuid, encode_vector
+from app.celery_app import celery
+from app.config import settings
+from app.database import engine, get_session
+from app.services import embedding_config
+from app.services.bedrock_client import embed_iter
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "ix_vectors_embedding_hnsw"
+NEXT_INDEX_NAME = "ix_vectors_embedding_next_hnsw"
+
+# The expressions migration 008 indexes; FIRST_PASS_DISTANCE in app/services/retrieval.py searches them
+INDEX_EXPRESSIONS = {
+    "vector": "{column} vector_cosine_ops",
+    "halfvec": "({column}::halfvec({dims})) halfvec_cosine_ops",
+    "binary": "(binary_quantize({column})::bit({dims})) bit_hamming_ops",
+}
+
+STAGE_TABLE = "reembed_stage"
+STAGE_COLUMNS = ["vector_id", "project_id", "embedding"]
+FLIP_ATTEMPTS = 5
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def _prepare(session, model_id: str, dimensions: int):
+    """Add the side columns the new embeddings are written to and record the target."""
+    row = session.execute(
+        text("SELECT next_model, next_dimensions FROM embedding_config WHERE id = 1")
+    ).fetchone()
+    if row.next_model is not None and (row.next_model, row.next_dimensions) != (model_id, dimensions):
+        raise ValueError(
+            f"A re-embed to {row.next_model} ({row.next_dimensions} dimensions) is already in progress; "
+            "run the job again with that target to finish it first"
+        )
+    session.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": settings.reembed_lock_timeout})
+    # Nullable without a default: metadata-only on every partition
+    session.execute(text(f"""
+        ALTER TABLE vectors
+            ADD COLUMN IF NOT EXISTS embedding_next vector({int(dimensions)}),
+            ADD COLUMN IF NOT EXISTS embed_model_next varchar(200),
+            ADD COLUMN IF NOT EXISTS embed_dim_next smallint
+    """))
+    session.execute(
+        text("""
+            UPDATE embedding_config SET next_model = :model, next_dimensions = :dimensions, updated_at = now()
+            WHERE id = 1
+        """),
+        {"model": model_id, "dimensions": dimensions},
+    )
+    session.commit()
+
+
+def _fill_batch(session, after: uuid.UUID, model_id: str, dimensions: int) -> uuid.UUID | None:
+    """Embed the next batch of vectors still missing embedding_next, in id order after `after`.
+
+    Returns the last id written, or None when nothing is left. Does not commit.
+    """
+    rows = session.execute(
+        text("""
+            SELECT v.id, v.project_id, c.text
+            FROM vectors v
+            JOIN chunks c ON c.id = v.chunk_id
+            WHERE v.embedding_next IS NULL AND v.id > :after
+            ORDER BY v.id
+            LIMIT :limit
+        """),
+        {"after": str(after), "limit": settings.reembed_batch_size},
+    ).fetchall()
+    if not rows:
+        return None
+
+    embeddings = embed_iter((r.text for r in rows), settings.reembed_concurrency, model_id, dimensions)
+    staged = [
+        (encode_uuid(r.id), encode_uuid(r.project_id), encode_vector(embedding))
+        for r, embedding in zip(rows, embeddings)
+    ]
+    session.execute(text(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} (
+            vector_id uuid, project_id uuid, embedding vector
+        ) ON COMMIT DELETE ROWS
+    """))
+    copy_rows(session, STAGE_TABLE, STAGE_COLUMNS, staged)
+    session.execute(
+        text(f"""
+            UPDATE vectors v
+            SET embedding_next = s.embedding, embed_model_next = :model, embed_dim_next = :dimensions
+            FROM {STAGE_TABLE} s
+            WHERE v.id = s.vector_id AND v.project_id = s.project_id
+        """),
+        {"model": model_id, "dimensions": dimensions},
+    )
+    return rows[-1].id
+
+
+def _fill(session, model_id: str, dimensions: int) -> int:
+    """One throttled pass over vectors, committing each batch so ingest and search carry on."""
+    after, batches = uuid.UUID(int=0), 0
+    while (last := _fill_batch(session, after, model_id, dimensions)) is not None:
+        session.commit()
+        batches += 1
+        after = last
+        if batches % 100 == 0:
+            logger.info(f"Re-embed: {batches} batches written, at vector {after}")
+        time.sleep(settings.reembed_pause_s)
+    return batches
+
+
+def _build_index(dimensions: int):
+    """Build the HNSW index on embedding_next without blocking writes.
+
+    CREATE INDEX CONCURRENTLY is not supported on a partitioned table, so the
+    parent index is created empty with ON ONLY and each partition's index is
+    built concurrently and attached. Re-running picks up where it stopped.
+    Returns the partition names.
+    """
+    expression = INDEX_EXPRESSIONS[settings.vector_storage].format(column="embedding_next", dims=int(dimensions))
+    using = f"USING hnsw ({expression}) WITH (m = 16, ef_construction = 64)"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {NEXT_INDEX_NAME} ON ONLY vectors {using}"))
+        partitions = conn.execute(
+            text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'vectors'::regclass ORDER BY 1")
+        ).scalars().all()
+        for partition in partitions:
+            name = f"{partition}_embedding_next_hnsw"
+            # An interrupted concurrent build leaves an invalid index behind
+            invalid = conn.execute(
+                text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+            ).scalar()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY {name}"))
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {partition} {using}"))
+            conn.execute(text(f"ALTER INDEX {NEXT_INDEX_NAME} ATTACH PARTITION {name}"))
+            logger.info(f"Re-embed: built {name}")
+        return partitions
+
+
+def _flip(session, model_id: str, dimensions: int, partitions: list[str]):
+    """Swap embedding_next in for embedding in one transaction.
+
+    Taking SHARE ROW EXCLUSIVE holds off ingest writes (searches continue) while
+    vectors written since the fill pass are embedded; the DDL after that needs
+    ACCESS EXCLUSIVE only for the renames and drops, which are catalog-only.
+    """
+    session.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": settings.reembed_lock_timeout})
+    session.execute(text("LOCK TABLE vectors IN SHARE ROW EXCLUSIVE MODE"))
+    after, caught_up = uuid.UUID(int=0), 0
+    while (last := _fill_batch(session, after, model_id, dimensions)) is not None:
+        after, caught_up = last, caught_up + 1
+
+    session.execute(text(f"DROP INDEX {INDEX_NAME}"))
+    session.execute(text("ALTER TABLE vectors DROP COLUMN embedding, DROP COLUMN embed_model, DROP COLUMN embed_dim"))
+    # embedding stays nullable: SET NOT NULL would scan every partition under the lock
+    for column in ("embedding", "embed_model", "embed_dim"):
+        session.execute(text(f"ALTER TABLE vectors RENAME COLUMN {column}_next TO {column}"))
+    session.execute(text(f"ALTER INDEX {NEXT_INDEX_NAME} RENAME TO {INDEX_NAME}"))
+    for partition in partitions:
+        session.execute(text(f"ALTER INDEX {partition}_embedding_next_hnsw RENAME TO {partition}_embedding_hnsw"))
+
+    session.execute(
+        text("""
+            UPDATE embedding_config
+            SET model = :model, dimensions = :dimensions, next_model = NULL, next_dimensions = NULL, updated_at = now()
+            WHERE id = 1
+        """),
+        {"model": model_id, "dimensions": dimensions},
+    )
+    # Cached answers and the API's in-process matrices hold old embeddings; both key on corpus_version
+    session.execute(text("UPDATE projects SET corpus_version = corpus_version + 1"))
+    session.execute(text("DELETE FROM answer_cache"))
+    session.commit()
+    return caught_up
+
+
+@celery.task(name="app.tasks.reembed.reembed_vectors")
+def reembed_vectors(dimensions: int, model_id: str | None = None):
+    """Re-embed every vector with a new model or dimension count, online.
+
+    New embeddings are written to a side column in throttled batches and
+    indexed concurrently; then reads flip to them atomically and the old
+    column and index are dropped. Ingest and search keep running throughout.
+    The job is resumable: running it again with the same target continues.
+    """
+    model_id = model_id or settings.bedrock_embed_model_id
+    session = get_session()
+    try:
+        if embedding_config.active(session) == (model_id, dimensions):
+            logger.info(f"Vectors already use {model_id} at {dimensions} dimensions")
+            return
+
+        _prepare(session, model_id, dimensions)
+        batches = _fill(session, model_id, dimensions)
+        logger.info(f"Re-embed: fill pass wrote {batches} batches, building index")
+        partitions = _build_index(dimensions)
+        # Vectors ingested during the first pass and the index build, so the flip has little left to do
+        batches = _fill(session, model_id, dimensions)
+        logger.info(f"Re-embed: second pass wrote {batches} batches, flipping")
+
+        for attempt in range(FLIP_ATTEMPTS):
+            try:
+                caught_up = _flip(session, model_id, dimensions, partitions)
+                break
+            except OperationalError as e:
+                session.rollback()
+                # lock_timeout: a long search or ingest batch holds vectors; try again shortly
+                if getattr(e.orig, "pgcode", None) != LOCK_NOT_AVAILABLE:
+                    raise
+                logger.warning(f"Re-embed flip attempt {attempt + 1} could not lock vectors ({e.orig}), retrying")
+                time.sleep(5 * (attempt + 1))
+        else:
+            raise RuntimeError(f"Could not lock vectors after {FLIP_ATTEMPTS} attempts; run the job again to retry the flip")
+
+        logger.info(f"Re-embed complete: now {model_id} at {dimensions} dimensions ({caught_up} late batches)")
+    finally:
+        session.close()
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+from app.services import bedrock_client
+
+
+def test_client_uses_tuned_transport():
+    bedrock_client._get_bedrock_client.cache_clear()
+    config = bedrock_client._get_bedrock_client().meta.config
+    settings = bedrock_client.settings
+    assert config.max_pool_connections == settings.bedrock_max_pool_connections
+    assert config.read_timeout == settings.bedrock_read_timeout_s
+    assert config.tcp_keepalive is True
+    bedrock_client._get_bedrock_client.cache_clear()
+
+
+def test_converse_runs_on_dedicated_executor(monkeypatch):
+    threads = []
+
+    class FakeClient:
+        def converse(self, **kwargs):
+            threads.append(threading.current_thread().name)
+            return {"output": {"message": {"content": [{"text": "ok"}]}}}
+
+    monkeypatch.setattr(bedrock_client, "_get_bedrock_client", lambda: FakeClient())
+    monkeypatch.setattr(bedrock_client.settings, "bedrock_rate_limit_enabled", False)
+    bedrock_client._adaptive_limit.cache_clear()
+    try:
+        assert asyncio.run(bedrock_client.converse([{"role": "user", "content": [{"text": "hi"}]}])) == "ok"
+    finally:
+        bedrock_client._adaptive_limit.cache_clear()
+        bedrock_client.shutdown_executor()
+    assert threads[0].startswith("bedrock")
+
+
+def test_converse_stream_yields_text_deltas(monkeypatch):
+    class FakeStream(list):
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    stream = FakeStream([
+        {"messageStart": {"role": "assistant"}},
+        {"contentBlockDelta": {"delta": {"text": "Hel"}}},
+        {"contentBlockDelta": {"delta": {"text": "lo"}}},
+        {"messageStop": {"stopReason": "end_turn"}},
+    ])
+
+    class FakeClient:
+        def converse_stream(self, **kwargs):
+            return {"stream": stream}
+
+    slots_held = []
+
+    async def collect():
+        texts = []
+        async for text in bedrock_client.converse_stream([{"role": "user", "content": [{"text": "hi"}]}]):
+            slots_held.append(bedrock_client._adaptive_limit("converse").in_flight)
+            texts.append(text)
+        slots_held.append(bedrock_client._adaptive_limit("converse").in_flight)
+        return texts
+
+    monkeypatch.setattr(bedrock_client, "_get_bedrock_client", lambda: FakeClient())
+    monkeypatch.setattr(bedrock_client.settings, "bedrock_rate_limit_enabled", False)
+    bedrock_client._adaptive_limit.cache_clear()
+    try:
+        assert asyncio.run(collect()) == ["Hel", "lo"]
+        # The concurrency slot is held while tokens arrive, and released when the stream ends
+        assert slots_held == [1, 1, 0]
+    finally:
+        bedrock_client._adaptive_limit.cache_clear()
+        bedrock_client.shutdown_executor()
+    assert stream.closed
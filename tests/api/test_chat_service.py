@@ -0,0 +1,49 @@
+from app.models.chat import Chat
+from app.models.message import Message
+from app.services import chat_service
+from app.services.bedrock_client import CACHE_POINT
+from app.services.chat_service import _converse_messages
+
+
+def test_converse_messages_alternate_roles():
+    messages = [
+        Message(role="user", content="first"),
+        Message(role="user", content="again"),
+        Message(role="assistant", content="answer"),
+    ]
+    assert _converse_messages(messages) == [
+        {"role": "user", "content": [{"text": "first"}, {"text": "again"}]},
+        {"role": "assistant", "content": [{"text": "answer"}]},
+    ]
+
+
+def test_prompt_caches_instructions_context_and_history(monkeypatch):
+    monkeypatch.setattr(chat_service.settings, "bedrock_prompt_cache_enabled", True)
+    chat = Chat(summary="earlier")
+    messages = [
+        Message(role="user", content="q1"),
+        Message(role="assistant", content="a1"),
+        Message(role="user", content="q2"),
+    ]
+    system, converse_messages = chat_service._prompt(chat, messages, "instructions", "ctx")
+
+    assert system[0]["text"].startswith("instructions") and "earlier" in system[0]["text"]
+    # Instructions and a short summary are below the cacheable minimum; only the context is checkpointed
+    assert system[1:] == [{"text": "Context from project documents:\nctx"}, CACHE_POINT]
+    # The last checkpoint closes the history; only the new question follows it
+    assert converse_messages[1]["content"] == [{"text": "a1"}, CACHE_POINT]
+    assert converse_messages[2]["content"] == [{"text": "q2"}]
+
+
+def test_prompt_caches_a_long_summary_on_its_own(monkeypatch):
+    monkeypatch.setattr(chat_service.settings, "bedrock_prompt_cache_enabled", True)
+    chat = Chat(summary="word " * 2000)
+    system, _ = chat_service._prompt(chat, [Message(role="user", content="q")], "instructions", "ctx")
+    assert system[1:] == [CACHE_POINT, {"text": "Context from project documents:\nctx"}, CACHE_POINT]
+
+
+def test_prompt_without_cache_points(monkeypatch):
+    monkeypatch.setattr(chat_service.settings, "bedrock_prompt_cache_enabled", False)
+    system, converse_messages = chat_service._prompt(Chat(), [Message(role="user", content="q")], "instructions", None)
+    assert system == [{"text": "instructions"}]
+    assert converse_messages == [{"role": "user", "content": [{"text": "q"}]}]
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.models.chat import Chat
+from app.models.message import Message
+from app.services import context_builder
+from app.services.context_builder import estimate_tokens, fit_chunks, split_history, truncate_tokens
+
+
+def _chat(turns: int, words: int = 10) -> list[Message]:
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    messages = []
+    for i in range(turns):
+        for role in ("user", "assistant"):
+            messages.append(Message(role=role, content=" ".join(["word"] * words), created_at=start + timedelta(seconds=len(messages))))
+    return messages
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    # CJK runs about one and a half characters a token, other non-ASCII about two
+    assert estimate_tokens("日本語日本語") == 4
+    assert estimate_tokens("привет") == 3
+
+
+def test_estimate_tokens_mixed_script():
+    text = "Quarterly report: 売上は前年比で増加 — выручка выросла"
+    ascii_chars = sum(ch.isascii() for ch in text)
+    assert estimate_tokens(text) == -(-(3 * ascii_chars + 8 * 9 + 6 * 15) // 12)
+    # Well under a token per character, as the old one-per-non-ASCII estimate counted
+    assert estimate_tokens(text) < ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def test_truncate_tokens_fits_estimate():
+    text = "abcd" * 5 + "日本語" * 10
+    cut = truncate_tokens(text, 10)
+    assert estimate_tokens(cut) <= 10
+    assert estimate_tokens(text[:len(cut) + 1]) > 10
+    assert truncate_tokens("short", 10) == "short"
+
+
+def test_split_history_keeps_last_turns():
+    messages = _chat(5)
+    older, window = split_history(messages, max_turns=2, max_tokens=10_000)
+    assert older == messages[:6]
+    assert window == messages[6:]
+    assert window[0].role == "user"
+
+
+def test_split_history_respects_token_budget_but_keeps_latest_turn():
+    messages = _chat(3, words=100)
+    older, window = split_history(messages, max_turns=10, max_tokens=10)
+    assert window == messages[4:]
+    assert len(older) == 4
+
+
+def test_should_fold_in_batches(monkeypatch):
+    monkeypatch.setattr(context_builder.settings, "chat_summary_batch_turns", 2)
+    monkeypatch.setattr(context_builder.settings, "chat_history_tokens", 10_000)
+    messages = _chat(3)
+    assert not context_builder.should_fold([])
+    assert not context_builder.should_fold(messages[:2])
+    assert context_builder.should_fold(messages[:4])
+
+
+def test_fold_updates_summary_and_watermark(monkeypatch):
+    prompts = []
+
+    async def fake_converse(messages, system=None, max_tokens=4096):
+        prompts.append(messages[0]["content"][0]["text"])
+        return "new summary"
+
+    monkeypatch.setattr(context_builder, "converse", fake_converse)
+    chat = Chat(summary="old summary")
+    older = _chat(2)
+    assert asyncio.run(context_builder.fold(chat, older))
+    assert chat.summary == "new summary"
+    assert chat.summary_through == older[-1].created_at
+    assert "old summary" in prompts[0] and "Assistant: word" in prompts[0]
+
+
+def test_fold_keeps_summary_when_bedrock_fails(monkeypatch):
+    async def failing_converse(*args, **kwargs):
+        raise RuntimeError("throttled")
+
+    monkeypatch.setattr(context_builder, "converse", failing_converse)
+    chat = Chat(summary="old summary")
+    assert not asyncio.run(context_builder.fold(chat, _chat(1)))
+    assert chat.summary == "old summary" and chat.summary_through is None
+
+
+def test_fit_chunks_in_rank_order_within_budget():
+    rows = [SimpleNamespace(text="a" * 40), SimpleNamespace(text="b" * 400), SimpleNamespace(text="c" * 40)]
+    fitted = fit_chunks(rows, max_tokens=25)
+    # The oversized second chunk is skipped; the third still fits
+    assert [text[0] for _, text in fitted] == ["a", "c"]
+
+
+def test_fit_chunks_cuts_an_oversized_top_chunk():
+    rows = [SimpleNamespace(text="a" * 400)]
+    [(row, text)] = fit_chunks(rows, max_tokens=10)
+    assert row is rows[0] and text == "a" * 40
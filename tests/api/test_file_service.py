@@ -0,0 +1,122 @@
+import asyncio
+import base64
+import hashlib
+import io
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.services import file_service
+from app.services.file_service import (
+    HashingReader,
+    InvalidUpload,
+    MultipartFileStream,
+    UploadTooLarge,
+    checksum_sha256,
+)
+from app.services.storage_client import presigned_put_url
+
+BOUNDARY = "planarboundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def _multipart(data: bytes, field: str = "file", filename: str = "notes.txt") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"comment\"\r\n\r\nhi\r\n"
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: text/plain\r\n\r\n"
+    ).encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def _chunks(body: bytes, sent: list, size: int = 64):
+    for start in range(0, len(body), size):
+        sent.append(size)
+        yield body[start:start + size]
+
+
+def test_hashing_reader_hashes_incrementally():
+    data = b"planar" * 1000
+    reader = HashingReader(io.BytesIO(data), max_bytes=len(data))
+    while reader.read(7):
+        pass
+    assert reader.size == len(data)
+    assert reader.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_hashing_reader_enforces_limit_while_reading():
+    reader = HashingReader(io.BytesIO(b"x" * 100), max_bytes=50)
+    assert reader.read(40) == b"x" * 40
+    with pytest.raises(UploadTooLarge):
+        reader.read(40)
+
+
+def test_checksum_sha256_is_base64_of_the_digest():
+    digest = hashlib.sha256(b"planar")
+    assert checksum_sha256(digest.hexdigest()) == base64.b64encode(digest.digest()).decode()
+
+
+def test_multipart_stream_yields_file_bytes():
+    data = bytes(range(256)) * 20
+
+    async def run():
+        stream = MultipartFileStream(_chunks(_multipart(data), []), CONTENT_TYPE)
+        await stream.open()
+        reader = HashingReader(stream, max_bytes=len(data))
+        out = b""
+        while chunk := await asyncio.to_thread(reader.read, 100):
+            out += chunk
+        return stream.filename, out, reader.sha256
+
+    filename, out, sha256 = asyncio.run(run())
+    assert (filename, out, sha256) == ("notes.txt", data, hashlib.sha256(data).hexdigest())
+
+
+def test_multipart_stream_stops_reading_body_at_size_limit():
+    body = _multipart(b"x" * 100_000)
+    sent = []
+
+    async def run():
+        stream = MultipartFileStream(_chunks(body, sent), CONTENT_TYPE)
+        await stream.open()
+        reader = HashingReader(stream, max_bytes=1000)
+        while await asyncio.to_thread(reader.read, 512):
+            pass
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(run())
+    assert sum(sent) < 2000
+
+
+def test_multipart_stream_requires_file_field():
+    async def run():
+        await MultipartFileStream(_chunks(_multipart(b"data", field="other"), []), CONTENT_TYPE).open()
+
+    with pytest.raises(InvalidUpload):
+        asyncio.run(run())
+
+
+def test_multipart_stream_rejects_truncated_body():
+    async def run():
+        stream = MultipartFileStream(_chunks(_multipart(b"y" * 1000)[:-200], []), CONTENT_TYPE)
+        await stream.open()
+        await asyncio.to_thread(stream.read)
+
+    with pytest.raises(InvalidUpload):
+        asyncio.run(run())
+
+
+def test_presigned_put_signs_length_and_checksum():
+    url = asyncio.run(presigned_put_url("uploads", "staging/p/x.pdf", "abc=", 123))
+    signed = parse_qs(urlsplit(url).query)["X-Amz-SignedHeaders"][0].split(";")
+    assert {"content-length", "x-amz-checksum-sha256"} <= set(signed)
+
+
+def test_direct_upload_rejects_oversize_before_presigning(monkeypatch):
+    async def fail(*args):
+        raise AssertionError("presigned an oversize upload")
+
+    monkeypatch.setattr(file_service, "presigned_put_url", fail)
+    too_big = file_service.settings.max_upload_size_mb * 1024 * 1024 + 1
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(file_service.create_direct_upload(uuid.uuid4(), "big.pdf", ".pdf", too_big, "0" * 64))
@@ -0,0 +1,23 @@
+import asyncio
+
+from app.services.rate_limiter import AdaptiveLimit
+
+
+def test_adaptive_limit_bounds_in_flight():
+    async def run():
+        limit = AdaptiveLimit(4)
+        limit.on_throttle()
+        peak = 0
+
+        async def work():
+            nonlocal peak
+            async with limit:
+                peak = max(peak, limit.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(work() for _ in range(8)))
+        return limit, peak
+
+    limit, peak = asyncio.run(run())
+    assert peak == 2
+    assert limit.in_flight == 0
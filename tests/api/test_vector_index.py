@@ -0,0 +1,106 @@
+import asyncio
+import struct
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services import vector_index
+from app.services.vector_index import ENTRY_OVERHEAD_BYTES, TOO_LARGE, ProjectMatrix, VectorIndexCache
+
+
+def _matrix(rows: int, dims: int, seed: int = 0) -> tuple[list[uuid.UUID], ProjectMatrix]:
+    rng = np.random.default_rng(seed)
+    ids = [uuid.uuid4() for _ in range(rows)]
+    vectors = vector_index._normalize(rng.standard_normal((rows, dims)).astype(np.float32))
+    chunk_ids = np.array([np.frombuffer(i.bytes, dtype=np.uint8) for i in ids])
+    return ids, ProjectMatrix(chunk_ids, vectors)
+
+
+def test_top_k_matches_brute_force():
+    ids, matrix = _matrix(500, 32)
+    query = np.random.default_rng(1).standard_normal(32).astype(np.float32)
+    expected = np.argsort(1 - matrix.matrix @ vector_index._normalize(query))[:10]
+
+    top_ids, distances = matrix.top_k(query.tolist(), 10)
+    assert top_ids == [str(ids[i]) for i in expected]
+    assert distances == sorted(distances)
+
+
+def test_top_k_float16_agrees_with_float32(monkeypatch):
+    monkeypatch.setattr(vector_index, "FLOAT16_BLOCK_ROWS", 64)
+    _, full = _matrix(300, 64)
+    half = ProjectMatrix(full.chunk_ids, full.matrix.astype(np.float16))
+    query = full.matrix[7].tolist()
+    assert half.top_k(query, 1)[0] == full.top_k(query, 1)[0]
+    assert abs(half.top_k(query, 1)[1][0]) < 1e-3
+
+
+def test_top_k_returns_fewer_rows_than_k():
+    _, matrix = _matrix(3, 8)
+    assert len(matrix.top_k([1.0] * 8, 10)[0]) == 3
+
+
+def test_decode_reads_vector_send_bytes():
+    # A trailing NUL byte must survive the round trip
+    chunk_id = uuid.UUID(bytes=uuid.uuid4().bytes[:15] + b"\x00")
+    data = struct.pack(">hh", 2, 0) + struct.pack(">ff", 3.0, 4.0)
+    matrix = vector_index._decode([(chunk_id, data)], 2)
+    assert matrix.chunk_ids[0].tobytes() == chunk_id.bytes
+    np.testing.assert_allclose(matrix.matrix[0], [0.6, 0.8])
+
+
+def test_cache_evicts_least_recently_used_beyond_budget():
+    _, matrix = _matrix(10, 4)
+    cache = VectorIndexCache(max_bytes=2 * matrix.nbytes)
+    cache.put(("a", 1, 4), matrix)
+    cache.put(("b", 1, 4), matrix)
+    cache.get(("a", 1, 4))
+    cache.put(("c", 1, 4), matrix)
+    assert cache.get(("b", 1, 4)) is None
+    assert cache.get(("a", 1, 4)) is matrix
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_drops_older_versions_of_a_project():
+    _, matrix = _matrix(10, 4)
+    cache = VectorIndexCache(max_bytes=10 * matrix.nbytes)
+    cache.put(("a", 1, 4), matrix)
+    cache.put(("a", 2, 4), TOO_LARGE)
+    assert cache.get(("a", 1, 4)) is None
+    assert cache.stats()["bytes"] == ENTRY_OVERHEAD_BYTES
+
+
+def test_cache_marks_matrices_over_budget_too_large():
+    _, matrix = _matrix(10, 4)
+    cache = VectorIndexCache(max_bytes=matrix.nbytes - 1)
+    cache.put(("a", 1, 4), matrix)
+    assert cache.get(("a", 1, 4)) is TOO_LARGE
+
+
+def test_concurrent_queries_share_one_load(monkeypatch):
+    ids, matrix = _matrix(10, 4)
+    loads = []
+
+    async def slow_load(db, project_id, dimensions):
+        loads.append(project_id)
+        await asyncio.sleep(0.05)
+        return matrix
+
+    class FakeSession:
+        async def execute(self, *args, **kwargs):
+            return SimpleNamespace(scalar_one=lambda: 1)
+
+    monkeypatch.setattr(vector_index.settings, "exact_search_enabled", True)
+    monkeypatch.setattr(vector_index, "_load", slow_load)
+    monkeypatch.setattr(vector_index, "_get_cache", lambda cache=VectorIndexCache(10 * matrix.nbytes): cache)
+
+    async def run():
+        return await asyncio.gather(*(
+            vector_index.nearest(FakeSession(), "p", matrix.matrix[0].tolist(), 1) for _ in range(5)
+        ))
+
+    results = asyncio.run(run())
+    assert loads == ["p"]
+    assert all(r[0] == [str(ids[0])] for r in results)
+    assert vector_index._loading == {}
@@ -0,0 +1,33 @@
+"""The worker keeps synchronous copies of some API modules; their SQL must not drift."""
+import ast
+from pathlib import Path
+
+import pytest
+
+SERVICES = Path(__file__).resolve().parents[2] / "services"
+
+SHARED = [
+    ("app/services/retrieval.py", ["FIRST_PASS_DISTANCE", "HYBRID_SEARCH_SQL", "VECTOR_SEARCH_SQL", "nearest_sql", "to_pgvector"]),
+    ("app/database.py", ["HNSW_SETTINGS_SQL", "hnsw_settings"]),
+]
+
+
+def _definitions(path: Path) -> dict[str, str]:
+    found = {}
+    for node in ast.parse(path.read_text()).body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    found[target.id] = ast.dump(node.value)
+        elif isinstance(node, ast.FunctionDef):
+            found[node.name] = ast.dump(ast.Module(body=node.body, type_ignores=[]))
+    return found
+
+
+@pytest.mark.parametrize("module, names", SHARED)
+def test_worker_copy_matches_api(module, names):
+    api = _definitions(SERVICES / "api" / module)
+    worker = _definitions(SERVICES / "worker" / module)
+    for name in names:
+        assert name in api and name in worker, name
+        assert api[name] == worker[name], f"{name} differs between the API and worker {module}"
@@ -0,0 +1,136 @@
+import random
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.services import bedrock_client
+
+
+def _throttle():
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+
+
+@pytest.fixture(autouse=True)
+def no_client(monkeypatch):
+    monkeypatch.setattr(bedrock_client, "_get_bedrock_client", lambda: None)
+    monkeypatch.setattr(bedrock_client.time, "sleep", lambda s: None)
+    monkeypatch.setattr(bedrock_client.settings, "embed_cache_enabled", False)
+    monkeypatch.setattr(bedrock_client.settings, "bedrock_rate_limit_enabled", False)
+    bedrock_client._adaptive_limit.cache_clear()
+
+
+def test_embed_batch_preserves_order(monkeypatch):
+    def fake_embed(text, model_id, dimensions):
+        time.sleep(random.random() / 1000)
+        return [float(len(text))]
+
+    monkeypatch.setattr(bedrock_client, "_invoke_embed", fake_embed)
+    texts = ["x" * i for i in range(1, 50)]
+    result = bedrock_client.embed_batch(texts, concurrency=8)
+    assert result == [[float(i)] for i in range(1, 50)]
+
+
+def test_embed_batch_empty():
+    assert bedrock_client.embed_batch([]) == []
+
+
+def test_embed_batch_retries_per_chunk(monkeypatch):
+    calls = {}
+
+    def flaky_embed(text, model_id, dimensions):
+        calls[text] = calls.get(text, 0) + 1
+        if text == "b" and calls[text] < 3:
+            raise _throttle()
+        return [1.0]
+
+    monkeypatch.setattr(bedrock_client, "_invoke_embed", flaky_embed)
+    assert bedrock_client.embed_batch(["a", "b", "c"]) == [[1.0], [1.0], [1.0]]
+    assert calls == {"a": 1, "b": 3, "c": 1}
+
+
+def test_embed_batch_does_not_retry_client_errors(monkeypatch):
+    def bad_embed(text, model_id, dimensions):
+        raise ClientError({"Error": {"Code": "ValidationException", "Message": "bad"}}, "InvokeModel")
+
+    monkeypatch.setattr(bedrock_client, "_invoke_embed", bad_embed)
+    with pytest.raises(ClientError):
+        bedrock_client.embed_batch(["a"])
+
+
+def test_embed_batch_embeds_duplicates_once(monkeypatch):
+    calls = []
+
+    def fake_embed(text, model_id, dimensions):
+        calls.append(text)
+        return [float(len(text))]
+
+    monkeypatch.setattr(bedrock_client, "_invoke_embed", fake_embed)
+    assert bedrock_client.embed_batch(["a b", "a  b", "c"]) == [[3.0], [3.0], [1.0]]
+    assert sorted(calls) == ["a b", "c"]
+
+
+def test_embed_batch_passes_model_and_dimensions(monkeypatch):
+    calls = []
+
+    def fake_embed(text, model_id, dimensions):
+        calls.append((model_id, dimensions))
+        return [0.0] * dimensions
+
+    monkeypatch.setattr(bedrock_client, "_invoke_embed", fake_embed)
+    assert bedrock_client.embed_batch(["a"], model_id="m", dimensions=256) == [[0.0] * 256]
+    assert bedrock_client.embed_batch(["b"]) == [[0.0] * bedrock_client.settings.embed_dimensions]
+    assert calls == [("m", 256), (bedrock_client.settings.bedrock_embed_model_id, bedrock_client.settings.embed_dimensions)]
+
+
+def test_throttle_shrinks_adaptive_limit(monkeypatch):
+    calls = []
+
+    def flaky_embed(text, model_id, dimensions):
+        calls.append(text)
+        if len(calls) == 1:
+            raise _throttle()
+        return [1.0]
+
+    monkeypatch.setattr(bedrock_client.settings, "embed_concurrency", 8)
+    monkeypatch.setattr(bedrock_client, "_invoke_embed", flaky_embed)
+    assert bedrock_client.embed("a") == [1.0]
+    # Halved on the throttle, then one additive step for the success
+    assert bedrock_client._adaptive_limit("embed").limit == 4.25
+
+
+def test_converse_retries_throttles(monkeypatch):
+    attempts = []
+
+    class FakeClient:
+        def converse(self, **kwargs):
+            attempts.append(kwargs)
+            if len(attempts) < 2:
+                raise _throttle()
+            return {"output": {"message": {"content": [{"text": "ok"}]}}}
+
+    monkeypatch.setattr(bedrock_client, "_get_bedrock_client", lambda: FakeClient())
+    assert bedrock_client.converse([{"role": "user", "content": [{"text": "hi"}]}]) == "ok"
+    assert len(attempts) == 2
+
+
+def test_converse_records_prompt_cache_usage(monkeypatch):
+    calls = []
+
+    class FakeClient:
+        def converse(self, **kwargs):
+            calls.append(kwargs)
+            return {
+                "output": {"message": {"content": [{"text": "ok"}]}},
+                "usage": {"inputTokens": 10, "outputTokens": 5, "cacheReadInputTokens": 2000, "cacheWriteInputTokens": 0},
+                "metrics": {"latencyMs": 900},
+            }
+
+    monkeypatch.setattr(bedrock_client, "_get_bedrock_client", lambda: FakeClient())
+    usage = {}
+    system = bedrock_client.with_cache_point([{"text": "instructions"}])
+    assert bedrock_client.converse([{"role": "user", "content": [{"text": "hi"}]}], system=system, usage=usage) == "ok"
+    assert calls[0]["system"] == [{"text": "instructions"}, bedrock_client.CACHE_POINT]
+    assert usage == {
+        "input_tokens": 10, "output_tokens": 5, "cache_read_tokens": 2000, "cache_write_tokens": 0, "latency_ms": 900,
+    }
@@ -0,0 +1,39 @@
+import hashlib
+import struct
+import uuid
+
+from pgvector.utils import Vector
+
+from app.bulk_writer import COPY_HEADER, content_hash, encode_copy, encode_jsonb, encode_text, encode_uuid, encode_vector
+
+
+def test_encode_copy_framing():
+    rows = [(b"ab", None), (b"", b"xyz")]
+    data = encode_copy(rows)
+    assert data.startswith(COPY_HEADER)
+    assert data.endswith(struct.pack(">h", -1))
+
+    body = data[len(COPY_HEADER):-2]
+    assert body == (
+        struct.pack(">h", 2) + struct.pack(">i", 2) + b"ab" + struct.pack(">i", -1)
+        + struct.pack(">h", 2) + struct.pack(">i", 0) + struct.pack(">i", 3) + b"xyz"
+    )
+
+
+def test_encode_vector_roundtrip():
+    embedding = [0.25, -1.5, 3.0]
+    decoded = Vector.from_binary(encode_vector(embedding)).to_list()
+    assert decoded == embedding
+
+
+def test_encode_scalars():
+    value = uuid.uuid4()
+    assert encode_uuid(str(value)) == value.bytes
+    assert encode_text("a\x00b") == b"ab"
+    assert encode_jsonb({"page": 1}) == b'\x01{"page": 1}'
+
+
+def test_content_hash_matches_stored_text():
+    assert content_hash("abc") == hashlib.sha256(b"abc").hexdigest()
+    # NUL bytes are stripped before storage, so they do not change the hash
+    assert content_hash("a\x00bc") == content_hash("abc")
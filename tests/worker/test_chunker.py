@@ -1,4 +1,4 @@
-from app.chunker import chunk_text
+from app.chunker import chunk_rows, chunk_text
 
 
 def test_short_text_single_chunk():
@@ -29,3 +29,24 @@ def test_overlap_present():
     text = "Sentence one. Sentence two. Sentence three. Sentence four. Sentence five. " * 20
     result = chunk_text(text, max_chars=200, overlap_chars=50)
     assert len(result) > 1
+
+
+def test_chunk_rows_repeats_header_and_tracks_ranges():
+    rows = [(1, "Name | Revenue")] + [(i, f"Product {i} | {i * 100}") for i in range(2, 12)]
+    result = list(chunk_rows(rows, max_rows=4, max_chars=10000))
+    assert [(start, end) for _, start, end in result] == [(2, 5), (6, 9), (10, 11)]
+    for text, _, _ in result:
+        assert text.startswith("Name | Revenue\n")
+
+
+def test_chunk_rows_respects_char_budget():
+    rows = [(1, "h")] + [(i, "x" * 40) for i in range(2, 22)]
+    result = list(chunk_rows(rows, max_rows=100, max_chars=200))
+    assert len(result) > 1
+    for text, _, _ in result:
+        assert len(text) <= 200
+
+
+def test_chunk_rows_header_only():
+    assert list(chunk_rows([(1, "a | b")])) == [("a | b", 1, 1)]
+    assert list(chunk_rows([])) == []
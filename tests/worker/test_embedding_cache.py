@@ -0,0 +1,26 @@
+from app.config import settings
+from app.services import embedding_cache
+from app.services.embedding_cache import cache_key, normalize_text
+
+
+def test_normalize_text_collapses_whitespace():
+    assert normalize_text("  Revenue\n\tQ1   2024 ") == "Revenue Q1 2024"
+
+
+def test_cache_key_ignores_whitespace_differences():
+    assert cache_key("a  b\n", "titan", 1024) == cache_key("a b", "titan", 1024)
+
+
+def test_cache_key_depends_on_model_and_dimensions():
+    base = cache_key("text", "titan", 1024)
+    assert cache_key("text", "titan", 512) != base
+    assert cache_key("text", "other", 1024) != base
+
+
+def test_stats_fail_open_when_redis_is_down(monkeypatch):
+    monkeypatch.setattr(settings, "redis_url", "redis://127.0.0.1:1/0")
+    embedding_cache._get_redis.cache_clear()
+    try:
+        assert "error" in embedding_cache.stats()
+    finally:
+        embedding_cache._get_redis.cache_clear()
@@ -6,24 +6,34 @@ FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures")
 def test_parse_csv():
     from app.parsers.csv_parser import parse_csv
     with open(os.path.join(FIXTURES, "sample.csv"), "rb") as f:
-        result = parse_csv(f.read())
+        result = list(parse_csv(f.read()))
     assert len(result) >= 1
     assert "Product A" in result[0]["text"]
     assert result[0]["metadata"]["type"] == "csv"
+    assert result[0]["metadata"]["row_start"] == 2
+    assert result[0]["text"].startswith("Name | Revenue | Quarter\n")
 
 
 def test_parse_txt():
+    from app.parsers.txt_parser import parse_txt
     with open(os.path.join(FIXTURES, "sample.txt"), "rb") as f:
-        data = f.read()
-    # TXT parser is inline lambda in ingest.py, replicate it
-    text = data.decode("utf-8", errors="replace")
-    assert "sample text document" in text
+        result = list(parse_txt(f))
+    assert len(result) == 1
+    assert "sample text document" in result[0]["text"]
+    assert result[0]["metadata"]["type"] == "text"
+
+
+def test_parsers_accept_file_objects():
+    from app.parsers.pdf_parser import parse_pdf
+    with open(os.path.join(FIXTURES, "sample.pdf"), "rb") as f:
+        result = list(parse_pdf(f))
+    assert result[0]["metadata"]["page"] == 1
 
 
 def test_parse_pdf():
     from app.parsers.pdf_parser import parse_pdf
     with open(os.path.join(FIXTURES, "sample.pdf"), "rb") as f:
-        result = parse_pdf(f.read())
+        result = list(parse_pdf(f.read()))
     assert len(result) >= 1
     assert result[0]["metadata"]["page"] == 1
 
@@ -31,7 +41,7 @@ def test_parse_pdf():
 def test_parse_pptx():
     from app.parsers.pptx_parser import parse_pptx
     with open(os.path.join(FIXTURES, "sample.pptx"), "rb") as f:
-        result = parse_pptx(f.read())
+        result = list(parse_pptx(f.read()))
     assert len(result) >= 1
     assert result[0]["metadata"]["slide"] == 1
 
@@ -39,7 +49,7 @@ def test_parse_pptx():
 def test_parse_docx():
     from app.parsers.docx_parser import parse_docx
     with open(os.path.join(FIXTURES, "sample.docx"), "rb") as f:
-        result = parse_docx(f.read())
+        result = list(parse_docx(f.read()))
     assert len(result) >= 1
     assert any("test document" in s["text"].lower() for s in result)
 
@@ -47,6 +57,70 @@ def test_parse_docx():
 def test_parse_xlsx():
     from app.parsers.xlsx_parser import parse_xlsx
     with open(os.path.join(FIXTURES, "sample.xlsx"), "rb") as f:
-        result = parse_xlsx(f.read())
+        result = list(parse_xlsx(f.read()))
     assert len(result) >= 1
     assert any(s["metadata"]["sheet"] == "Revenue" for s in result)
+    assert all(s["metadata"]["row_start"] <= s["metadata"]["row_end"] for s in result)
+
+
+def _multi_page_pdf(tmp_path, copies):
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for _ in range(copies):
+        writer.append(os.path.join(FIXTURES, "sample.pdf"))
+    path = tmp_path / "multi.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def test_parse_pdf_parallel_matches_serial(tmp_path, monkeypatch):
+    from app.config import settings
+    from app.parsers.pdf_parser import parse_pdf
+    path = _multi_page_pdf(tmp_path, 6)
+    monkeypatch.setattr(settings, "pdf_parallel_min_pages", 2)
+    monkeypatch.setattr(settings, "pdf_pages_per_shard", 2)
+
+    monkeypatch.setattr(settings, "pdf_parallel_workers", 1)
+    with open(path, "rb") as f:
+        serial = list(parse_pdf(f))
+    monkeypatch.setattr(settings, "pdf_parallel_workers", 2)
+    with open(path, "rb") as f:
+        parallel = list(parse_pdf(f))
+
+    assert parallel == serial
+    assert [s["metadata"]["page"] for s in parallel] == [1, 2, 3, 4, 5, 6]
+
+
+def test_pdf_page_timeout_skips_page():
+    import time
+    from app.parsers.pdf_parser import _extract_page
+
+    class SlowPage:
+        def extract_text(self):
+            time.sleep(2)
+            return "never"
+
+    assert _extract_page(SlowPage(), 0, 0.05) == ""
+
+
+def test_serial_pdf_page_timeout_skips_page(tmp_path, monkeypatch):
+    import time
+    from app.config import settings
+    from app.parsers import pdf_parser
+    path = _multi_page_pdf(tmp_path, 3)
+    monkeypatch.setattr(settings, "pdf_parallel_workers", 1)
+    monkeypatch.setattr(settings, "pdf_page_timeout_s", 0.5)
+    page_text = pdf_parser._page_text
+
+    def slow_second_page(reader, index):
+        if index == 1:
+            time.sleep(3)
+        return page_text(reader, index)
+
+    monkeypatch.setattr(pdf_parser, "_page_text", slow_second_page)
+    start = time.monotonic()
+    with open(path, "rb") as f:
+        pages = [s["metadata"]["page"] for s in pdf_parser.parse_pdf(f)]
+    assert pages == [1, 3]
+    assert time.monotonic() - start < 2.5
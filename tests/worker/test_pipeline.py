@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from app import pipeline
+
+
+def test_prefetch_preserves_order():
+    assert list(pipeline.prefetch(range(100), maxsize=4)) == list(range(100))
+
+
+def test_prefetch_is_bounded():
+    produced = []
+
+    def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    stream = pipeline.prefetch(source(), maxsize=3)
+    assert next(stream) == 0
+    threading.Event().wait(0.2)
+    # one item consumed, at most maxsize queued, one blocked on put
+    assert len(produced) <= 5
+    stream.close()
+
+
+def test_prefetch_reraises_producer_errors():
+    def source():
+        yield 1
+        raise ValueError("bad page")
+
+    stream = pipeline.prefetch(source(), maxsize=2)
+    assert next(stream) == 1
+    with pytest.raises(ValueError, match="bad page"):
+        next(stream)
+
+
+def test_embed_stage_pairs_embeddings_with_chunks(monkeypatch):
+    monkeypatch.setattr(pipeline, "embed_iter", lambda texts, **kw: ([float(len(t))] for t in texts))
+    chunks = [("a", {"page": 1}), ("bb", {"page": 2})]
+    assert list(pipeline.embed_stage(iter(chunks))) == [("a", {"page": 1}, [1.0]), ("bb", {"page": 2}, [2.0])]
@@ -0,0 +1,44 @@
+from app.services import query_cache
+from app.services.query_cache import ENTRY_OVERHEAD_BYTES, QueryEmbeddingCache
+
+ENTRY_BYTES = 4 * 4 + ENTRY_OVERHEAD_BYTES
+
+
+def test_get_put_and_metrics():
+    cache = QueryEmbeddingCache(max_bytes=10 * ENTRY_BYTES, ttl_s=60)
+    assert cache.get("k") is None
+    cache.put("k", [1.0, 2.0, 3.0, 4.0])
+    assert cache.get("k") == [1.0, 2.0, 3.0, 4.0]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (1, 1, 1, ENTRY_BYTES)
+
+
+def test_evicts_least_recently_used_beyond_budget():
+    cache = QueryEmbeddingCache(max_bytes=2 * ENTRY_BYTES, ttl_s=60)
+    cache.put("a", [0.0] * 4)
+    cache.put("b", [0.0] * 4)
+    cache.get("a")
+    cache.put("c", [0.0] * 4)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = QueryEmbeddingCache(max_bytes=10 * ENTRY_BYTES, ttl_s=5)
+    cache.put("k", [0.0] * 4)
+    now[0] += 6
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["bytes"] == 0
+
+
+def test_module_cache_keys_on_normalized_text(monkeypatch):
+    monkeypatch.setattr(query_cache.settings, "query_cache_enabled", True)
+    query_cache._get_cache.cache_clear()
+    query_cache.put("What is  revenue?", [1.0], "titan", 1024)
+    assert query_cache.get("What is revenue?\n", "titan", 1024) == [1.0]
+    assert query_cache.get("What is revenue?", "other", 1024) is None
+    query_cache._get_cache.cache_clear()
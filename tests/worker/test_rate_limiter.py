@@ -0,0 +1,49 @@
+import threading
+import time
+
+from app.services.rate_limiter import AdaptiveLimit
+
+
+def test_adaptive_limit_additive_increase_capped():
+    limit = AdaptiveLimit(4)
+    limit.limit = 2.0
+    limit.on_success()
+    assert limit.limit == 2.5
+    for _ in range(20):
+        limit.on_success()
+    assert limit.limit == 4
+
+
+def test_adaptive_limit_halves_once_per_cooldown():
+    limit = AdaptiveLimit(16, cooldown_s=60)
+    limit.on_throttle()
+    limit.on_throttle()
+    assert limit.limit == 8
+
+
+def test_adaptive_limit_never_below_minimum():
+    limit = AdaptiveLimit(2, cooldown_s=0)
+    for _ in range(5):
+        limit.on_throttle()
+    assert limit.limit == 1
+
+
+def test_adaptive_limit_bounds_in_flight():
+    limit = AdaptiveLimit(2)
+    peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal peak
+        with limit:
+            with lock:
+                peak = max(peak, limit.in_flight)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak <= 2
+    assert limit.in_flight == 0